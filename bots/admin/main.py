@@ -8,6 +8,7 @@ from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.filters import Command
 from core.storage import load_state, save_state, get_items, add_item, get_default_state, remove_item
 from core.config import ADMIN_BOT_TOKEN, ADMIN_IDS
+from core.user_cache import get_cache_stats
 
 router = Router()
 ITEMS_PER_PAGE = 20
@@ -139,6 +140,13 @@ async def stats_handler(message: Message):
 
     buffer = data.get('buffer_group', '')
 
+    # User cache hisoblagichlari (butun cache o'qilmaydi)
+    try:
+        cache_stats = get_cache_stats()
+    except Exception as e:
+        print(f"[OGOHLANTIRISH] User cache statistikasi olinmadi: {e}")
+        cache_stats = {'total': 0, 'with_username': 0, 'with_phone': 0}
+
     stats_text = (
         f"📊 <b>Statistika</b>\n\n"
         f"🔑 Kalit so'zlar: {len(data.get('keywords', []))} ta\n"
@@ -147,7 +155,10 @@ async def stats_handler(message: Message):
         f"   ⚡ FAST: {fast_count} ta\n"
         f"   📝 NORMAL: {normal_count} ta\n"
         f"📤 Target guruhlar: {len(data.get('target_groups', []))} ta\n"
-        f"⚡ Buffer guruh: {'✅ Sozlangan' if buffer else '❌ Sozlanmagan'}"
+        f"⚡ Buffer guruh: {'✅ Sozlangan' if buffer else '❌ Sozlanmagan'}\n\n"
+        f"👥 User cache: {cache_stats['total']} ta\n"
+        f"   👤 Username bilan: {cache_stats['with_username']} ta\n"
+        f"   📞 Telefon bilan: {cache_stats['with_phone']} ta"
     )
     await message.answer(stats_text, parse_mode='html')
 
@@ -0,0 +1,133 @@
+"""
+Cache Log - duplicate cache uchun append-only o'zgarishlar jurnali
+
+Har bir xabarda butun cache qayta yozilmaydi:
+- O'zgarishlar xotiradagi navbatga qo'shiladi (handler hech narsa yozmaydi)
+- Fon writer ularni har bir necha soniyada jurnal oxiriga qo'shadi (NDJSON)
+- Vaqti-vaqti bilan butun holat snapshot faylga yoziladi va jurnal tozalanadi
+- Yuklashda: snapshot + jurnal qayta o'ynaladi (crash'dan keyin tiklash)
+
+Yozish ishlari thread'da bajariladi - event loop bloklanmaydi.
+Jurnal yozuvlari mutlaq qiymatlarni saqlaydi (qayta o'ynash xavfsiz).
+Snapshot formati sukut bo'yicha JSON, read/write funksiyalari bilan almashtiriladi.
+"""
+
+import asyncio
+import json
+import os
+
+
+def _read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+
+class ChangeLog:
+    """
+    Snapshot + append-only jurnal
+
+    Ishlatish:
+        log = ChangeLog("data/duplicate_cache.json", "data/duplicate_cache.log")
+        snapshot, ops = log.load()
+        log.append({"op": "add", ...})
+        await log.flush()
+        await log.compact(build_snapshot)
+    """
+
+    def __init__(self, snapshot_file, log_file, read_snapshot=_read_json, write_snapshot=_write_json):
+        self.snapshot_file = snapshot_file
+        self.log_file = log_file
+        self._read_snapshot = read_snapshot      # read_snapshot(path) -> data
+        self._write_snapshot_file = write_snapshot   # write_snapshot(path, data)
+        self._pending = []
+        self._log_size = 0       # Jurnaldagi yozuvlar soni (oxirgi compaction'dan beri)
+        self._io_lock = asyncio.Lock()
+
+    @property
+    def log_size(self):
+        return self._log_size + len(self._pending)
+
+    def append(self, op):
+        """O'zgarishni navbatga qo'shish (diskka yozilmaydi)"""
+        self._pending.append(op)
+
+    def load(self):
+        """
+        Snapshot va jurnalni o'qish
+
+        Returns:
+            (snapshot dict, [op, ...])
+        """
+        snapshot = {}
+        if os.path.exists(self.snapshot_file):
+            snapshot = self._read_snapshot(self.snapshot_file)
+
+        ops = []
+        if os.path.exists(self.log_file):
+            with open(self.log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        ops.append(json.loads(line))
+                    except ValueError:
+                        # Crash paytida chala yozilgan oxirgi qator
+                        break
+
+        self._log_size = len(ops)
+        return snapshot, ops
+
+    def _write_ops(self, ops):
+        os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
+        with open(self.log_file, 'a', encoding='utf-8') as f:
+            f.writelines(json.dumps(op, ensure_ascii=False, separators=(',', ':')) + "\n" for op in ops)
+
+    def _write_snapshot(self, data):
+        os.makedirs(os.path.dirname(self.snapshot_file), exist_ok=True)
+        tmp_file = self.snapshot_file + ".tmp"
+        self._write_snapshot_file(tmp_file, data)
+        os.replace(tmp_file, self.snapshot_file)
+
+        # Snapshot barcha o'zgarishlarni o'z ichiga oladi - jurnal endi kerak emas
+        with open(self.log_file, 'w', encoding='utf-8'):
+            pass
+
+    def flush_sync(self):
+        """Navbatdagi o'zgarishlarni darhol yozish (shutdown uchun)"""
+        ops, self._pending = self._pending, []
+        if ops:
+            self._write_ops(ops)
+            self._log_size += len(ops)
+
+    async def flush(self):
+        """Navbatdagi o'zgarishlarni jurnalga yozish (thread'da)"""
+        async with self._io_lock:
+            ops, self._pending = self._pending, []
+            if ops:
+                await asyncio.to_thread(self._write_ops, ops)
+                self._log_size += len(ops)
+
+    def compact_sync(self, build_snapshot):
+        """Snapshot yozish va jurnalni tozalash (sinxron)"""
+        data = build_snapshot()
+        self._pending = []
+        self._write_snapshot(data)
+        self._log_size = 0
+
+    async def compact(self, build_snapshot):
+        """
+        Snapshot yozish va jurnalni tozalash (thread'da)
+
+        `build_snapshot()` qulf olingandan keyin loop'da chaqiriladi - natija
+        navbatdagi barcha o'zgarishlarni o'z ichiga oladi, shuning uchun ular
+        tashlab yuboriladi. Yozish paytidagi yangi o'zgarishlar keyingi
+        flush'da toza jurnalga tushadi.
+        """
+        async with self._io_lock:
+            data = build_snapshot()
+            self._pending = []
+            await asyncio.to_thread(self._write_snapshot, data)
+            self._log_size = 0
@@ -0,0 +1,84 @@
+"""
+Delete Batcher - takroriy xabarlarni guruhlab o'chirish
+
+Har bir dublikat uchun alohida delete_message chaqirilsa, 50 ta qayta
+yuborilgan e'lon 50 ta so'rov bo'ladi va tezda rate limit'ga uriladi.
+
+- O'chirishlar chat bo'yicha navbatga qo'yiladi
+- Qisqa oyna (window) tugaganda yoki 100 ta ID yig'ilganda bitta
+  deleteMessages so'rovi bilan o'chiriladi
+- Chaqiruvchi natijani kutadi - hisoblagichlar batch tugagandan keyin yangilanadi
+"""
+
+import asyncio
+
+# Bot API deleteMessages: bitta so'rovda maksimal 100 ta xabar
+MAX_BATCH_SIZE = 100
+
+
+class DeleteBatcher:
+    """
+    Chat bo'yicha o'chirish navbati
+
+    Ishlatish:
+        batcher = DeleteBatcher(bot, window=1.0)
+        await batcher.delete(chat_id, message_id)   # batch tugaguncha kutadi
+    """
+
+    def __init__(self, bot, window=1.0):
+        self.bot = bot
+        self.window = window
+        self._pending = {}    # {chat_id: [(message_id, future), ...]}
+        self._timers = {}     # {chat_id: asyncio.Task}
+        self._tasks = set()   # Ishlayotgan batch'lar (GC'dan saqlash uchun)
+
+    async def delete(self, chat_id, message_id):
+        """
+        Xabarni o'chirish navbatiga qo'yish va batch natijasini kutish
+
+        Xatolik bo'lsa (admin emas va h.k.) exception shu yerda ko'tariladi.
+        """
+        future = asyncio.get_running_loop().create_future()
+        batch = self._pending.setdefault(chat_id, [])
+        batch.append((message_id, future))
+
+        if len(batch) >= MAX_BATCH_SIZE:
+            # To'ldi - oynani kutmasdan yuborish
+            self._start(self._send(chat_id, self._pending.pop(chat_id)))
+        elif chat_id not in self._timers:
+            self._timers[chat_id] = self._start(self._flush_later(chat_id))
+
+        return await future
+
+    def _start(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _flush_later(self, chat_id):
+        await asyncio.sleep(self.window)
+        self._timers.pop(chat_id, None)
+        batch = self._pending.pop(chat_id, None)
+        if batch:
+            await self._send(chat_id, batch)
+
+    async def _send(self, chat_id, batch):
+        try:
+            await self.bot.delete_messages(chat_id, [message_id for message_id, _ in batch])
+            error = None
+        except Exception as e:
+            error = e
+
+        for _, future in batch:
+            _resolve(future, error)
+
+
+def _resolve(future, error):
+    # Kutayotgan handler bekor qilingan bo'lishi mumkin
+    if future.done():
+        return
+    if error is None:
+        future.set_result(True)
+    else:
+        future.set_exception(error)
@@ -0,0 +1,434 @@
+"""
+Fingerprint Table - xabar barmoq izlarini ixcham saqlash
+
+Har bir yozuv uchun 32 belgili hex string + 3 maydonli dict o'rniga:
+- Barmoq izi 64-bitli butun son (MD5 ning birinchi 8 bayti)
+- Open addressing (linear probing) hash jadvali, parallel array'lar:
+  fingerprint (Q), simhash (Q), chat_id (q), message_id (I), vaqt (I), count (I)
+  - bitta slot 37 bayt (dict + hex str bilan yozuv ~400+ bayt)
+- Jadval kerak bo'lganda ikki barobar o'sadi, `capacity` dan oshmaydi
+- To'lganda CLOCK (LRU yaqinlashuvi) bilan eng kam ishlatilgan yozuv chiqariladi
+- Muddati o'tgan yozuvlar qidiruvda o'tkazib yuboriladi
+- Near-duplicate rejimida SimHash indeksi har yozuv uchun 8 + (threshold + 1) * 4
+  bayt tugun va zanjir boshlari qo'shadi (threshold=3 da ~35 bayt); simhash
+  ikkinchi marta saqlanmaydi, jadvaldan o'qiladi
+- Eskirish soatlik savatlar bo'yicha: har soat uchun o'sha soatda qo'shilgan
+  barmoq izlari ro'yxati (array('Q')). evict() faqat eskirgan soatlarni ko'radi -
+  O(eskirganlar), butun jadval aylanib chiqilmaydi va qayta qurilmaydi
+
+Fayl formati (snapshot) - ikkilik, little-endian, 8 baytga tekislangan:
+    FILE_HEADER (magic, guruhlar soni)
+    har guruh: kalit uzunligi + kalit (tekislangan), jadval uzunligi, jadval baytlari
+    jadval: TABLE_HEADER (slots, size) + array'lar ketma-ket
+Array'lar xom holda yoziladi: fayl bir marta o'qiladi va har bir array
+memoryview bo'lagidan to'g'ridan-to'g'ri to'ldiriladi (oraliq bytes nusxasisiz).
+"""
+
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import NamedTuple
+
+from bots.duplicate_remover.simhash import SimHashIndex
+
+FILE_MAGIC = b"DUPFPT01"
+FILE_HEADER = struct.Struct("<8sI4x")
+KEY_HEADER = struct.Struct("<I4x")
+TABLE_LENGTH = struct.Struct("<Q")
+TABLE_HEADER = struct.Struct("<II")
+
+# Boshlang'ich slotlar soni va maksimal to'ldirilganlik (3/4)
+MIN_SLOTS = 64
+
+# Eskirish savatlari kengligi, soniya
+BUCKET_SECONDS = 3600
+
+# Snapshot'dagi array'lar tartibi: (atribut, typecode)
+_FIELDS = (
+    ("_keys", "Q"),
+    ("_simhashes", "Q"),
+    ("_chat_ids", "q"),
+    ("_message_ids", "I"),
+    ("_timestamps", "I"),
+    ("_counts", "I"),
+)
+
+assert all(array(code).itemsize == {"Q": 8, "q": 8, "I": 4}[code] for _, code in _FIELDS)
+
+
+class FingerprintEntry(NamedTuple):
+    """Jadval yozuvi (nusxa - o'zgartirish uchun increment/set_count)"""
+    first_message_id: int
+    chat_id: int          # Global rejimda birinchi xabar guruhi, aks holda 0
+    timestamp: int
+    count: int
+
+
+def _slots_for(capacity):
+    """`capacity` ta yozuv 3/4 to'ldirilganlikdan oshmaydigan eng kichik 2^n"""
+    slots = MIN_SLOTS
+    while slots * 3 // 4 < capacity:
+        slots *= 2
+    return slots
+
+
+class FingerprintTable:
+    """
+    Bitta guruhning (yoki global) barmoq izlari jadvali
+
+    Ishlatish:
+        table = FingerprintTable(capacity=100000, hours=24)
+        table.add(fingerprint, message_id, int(time.time()))
+        entry = table.get(fingerprint)
+        count = table.increment(fingerprint)
+        removed = table.evict(time.time())
+    """
+
+    def __init__(self, capacity, hours=24, simhash_threshold=3):
+        self.capacity = max(int(capacity), 1)
+        self.hours = hours
+        self.simhash_threshold = simhash_threshold
+        self._max_slots = _slots_for(self.capacity)
+        self._near = None     # SimHashIndex (birinchi simhash qo'shilganda)
+        self._hours = {}      # {soat raqami: array('Q') - o'sha soatda qo'shilgan barmoq izlari}
+        self._hour_items = 0  # Soatlik ro'yxatlardagi jami elementlar
+        self._allocate(min(MIN_SLOTS, self._max_slots))
+
+    def _allocate(self, slots):
+        self._slots = slots
+        self._mask = slots - 1
+        self._size = 0
+        self._hand = 0        # CLOCK strelkasi
+        for name, code in _FIELDS:
+            setattr(self, name, array(code, bytes(slots * array(code).itemsize)))
+        self._refs = bytearray(slots)
+
+    def __len__(self):
+        return self._size
+
+    # ------------------------------------------------------------
+    # Ichki: qidiruv, o'chirish, qayta qurish
+    # ------------------------------------------------------------
+
+    def _find(self, fingerprint):
+        keys, mask = self._keys, self._mask
+        i = fingerprint & mask
+        while True:
+            key = keys[i]
+            if key == fingerprint:
+                return i
+            if key == 0:
+                return -1
+            i = (i + 1) & mask
+
+    def _put(self, fingerprint, message_id, timestamp, chat_id, simhash_value, count):
+        keys, mask = self._keys, self._mask
+        i = fingerprint & mask
+        while keys[i]:
+            i = (i + 1) & mask
+        keys[i] = fingerprint
+        self._message_ids[i] = message_id
+        self._timestamps[i] = timestamp
+        self._chat_ids[i] = chat_id
+        self._simhashes[i] = simhash_value
+        self._counts[i] = count
+        self._refs[i] = 1
+        self._size += 1
+        return i
+
+    def _delete(self, i):
+        """Backward-shift o'chirish (tombstone'siz)"""
+        keys, mask = self._keys, self._mask
+        simhash_value = self._simhashes[i]
+        if simhash_value and self._near is not None:
+            self._near.remove(simhash_value, keys[i])
+
+        hole = i
+        j = i
+        while True:
+            j = (j + 1) & mask
+            key = keys[j]
+            if key == 0:
+                break
+            # Yozuv o'z "uyi"dan teshikkacha bo'lgan masofadan uzoqroqda bo'lsa - suriladi
+            if ((j - (key & mask)) & mask) >= ((j - hole) & mask):
+                for name, _ in _FIELDS:
+                    field = getattr(self, name)
+                    field[hole] = field[j]
+                self._refs[hole] = self._refs[j]
+                hole = j
+
+        for name, _ in _FIELDS:
+            getattr(self, name)[hole] = 0
+        self._refs[hole] = 0
+        self._size -= 1
+
+    def _evict_one(self):
+        """CLOCK: ref biti o'chgan birinchi yozuvni chiqarish"""
+        keys, refs, mask = self._keys, self._refs, self._mask
+        while True:
+            i = self._hand
+            self._hand = (i + 1) & mask
+            if keys[i]:
+                if refs[i]:
+                    refs[i] = 0
+                else:
+                    self._delete(i)
+                    return
+
+    def _live_positions(self, min_timestamp=0):
+        keys, timestamps = self._keys, self._timestamps
+        return [i for i in range(self._slots) if keys[i] and timestamps[i] >= min_timestamp]
+
+    def _rebuild(self, slots, positions):
+        """Berilgan yozuvlarni yangi (slots) jadvalga ko'chirish"""
+        old = {name: getattr(self, name) for name, _ in _FIELDS}
+        old_refs = self._refs
+        self._allocate(slots)
+        for i in positions:
+            j = self._put(old["_keys"][i], old["_message_ids"][i], old["_timestamps"][i],
+                          old["_chat_ids"][i], old["_simhashes"][i], old["_counts"][i])
+            self._refs[j] = old_refs[i]
+
+    def _track_hour(self, fingerprint, timestamp):
+        """Barmoq izini qo'shilgan soatining ro'yxatiga yozish"""
+        hour = timestamp // BUCKET_SECONDS
+        fingerprints = self._hours.get(hour)
+        if fingerprints is None:
+            fingerprints = self._hours[hour] = array("Q")
+        fingerprints.append(fingerprint)
+        self._hour_items += 1
+
+        # CLOCK bilan chiqarilgan yozuvlar ro'yxatlarda qoladi - vaqti-vaqti bilan
+        # tozalanadi (amortizatsiyalangan O(1), xotira capacity bilan chegaralangan)
+        if self._hour_items > 2 * self.capacity + MIN_SLOTS:
+            self._compact_hours()
+
+    def _simhash_of(self, fingerprint):
+        """SimHash indeksi uchun: kalitning simhash'i (jadvaldan)"""
+        i = self._find(fingerprint)
+        return (self._simhashes[i] or None) if i >= 0 else None
+
+    def _hour_of(self, fingerprint):
+        i = self._find(fingerprint)
+        return self._timestamps[i] // BUCKET_SECONDS if i >= 0 else None
+
+    def _compact_hours(self):
+        """Soatlik ro'yxatlardan jadvalda yo'q (yoki boshqa soatga o'tgan) izlarni olib tashlash"""
+        hours = {}
+        seen = set()
+        for hour, fingerprints in self._hours.items():
+            live = array("Q")
+            for fingerprint in fingerprints:
+                if fingerprint not in seen and self._hour_of(fingerprint) == hour:
+                    seen.add(fingerprint)
+                    live.append(fingerprint)
+            if live:
+                hours[hour] = live
+        self._hours = hours
+        self._hour_items = len(seen)
+
+    def _min_timestamp(self, now=None):
+        return int((time.time() if now is None else now) - self.hours * 3600)
+
+    # ------------------------------------------------------------
+    # Ommaviy API
+    # ------------------------------------------------------------
+
+    def add(self, fingerprint, message_id, timestamp, chat_id=0, simhash_value=0):
+        """Yangi barmoq izi (mavjud bo'lsa maydonlari yangilanadi - replay uchun)"""
+        timestamp = int(timestamp)
+        i = self._find(fingerprint)
+        if i >= 0:
+            if timestamp // BUCKET_SECONDS != self._timestamps[i] // BUCKET_SECONDS:
+                self._track_hour(fingerprint, timestamp)
+            self._message_ids[i] = message_id
+            self._timestamps[i] = timestamp
+            self._chat_ids[i] = chat_id
+            self._refs[i] = 1
+            return
+
+        if self._size >= self.capacity:
+            self._evict_one()
+        elif (self._size + 1) > self._slots * 3 // 4 and self._slots < self._max_slots:
+            self._rebuild(self._slots * 2, self._live_positions())
+
+        self._put(fingerprint, message_id, timestamp, chat_id, simhash_value, 0)
+        self._track_hour(fingerprint, timestamp)
+
+        if simhash_value:
+            if self._near is None:
+                self._near = SimHashIndex(self.simhash_threshold, self._simhash_of)
+            self._near.add(simhash_value, fingerprint)
+
+    def get(self, fingerprint):
+        """
+        Yozuv yoki None (yo'q yoki muddati o'tgan)
+
+        Topilgan yozuv "ishlatilgan" deb belgilanadi (CLOCK).
+        """
+        i = self._find(fingerprint)
+        if i < 0:
+            return None
+        if self._timestamps[i] < self._min_timestamp():
+            self._delete(i)
+            return None
+        self._refs[i] = 1
+        return FingerprintEntry(self._message_ids[i], self._chat_ids[i],
+                                self._timestamps[i], self._counts[i])
+
+    def find_near(self, simhash_value):
+        """SimHash bo'yicha deyarli bir xil yozuvning barmoq izi yoki None"""
+        if self._near is None:
+            return None
+        return self._near.find(simhash_value)
+
+    def increment(self, fingerprint):
+        """Dublikatlar sonini oshirish. Returns: yangi son yoki None (yozuv chiqarilgan)"""
+        i = self._find(fingerprint)
+        if i < 0:
+            return None
+        self._counts[i] += 1
+        return self._counts[i]
+
+    def set_count(self, fingerprint, count):
+        """Dublikatlar sonini o'rnatish (replay uchun)"""
+        i = self._find(fingerprint)
+        if i >= 0:
+            self._counts[i] = count
+
+    def total_count(self):
+        """Barcha yozuvlar bo'yicha o'chirilgan dublikatlar soni"""
+        return sum(self._counts)
+
+    def evict(self, now):
+        """
+        Eskirgan soatlik savatlarni tashlab yuborish - faqat shu soatlarda
+        qo'shilgan yozuvlar o'chiriladi (backward-shift), qolgan jadvalga tegilmaydi
+
+        Returns:
+            O'chirilgan yozuvlar soni
+        """
+        # Chegara tushgan savat saqlanadi - yozuv muddatidan oldin o'chmaydi
+        oldest_live = self._min_timestamp(now) // BUCKET_SECONDS
+        timestamps = self._timestamps
+        removed = 0
+        for hour in [hour for hour in self._hours if hour < oldest_live]:
+            fingerprints = self._hours.pop(hour)
+            self._hour_items -= len(fingerprints)
+            for fingerprint in fingerprints:
+                i = self._find(fingerprint)
+                # Yozuv chiqarilgan yoki keyinroq qayta qo'shilgan bo'lishi mumkin
+                if i >= 0 and timestamps[i] // BUCKET_SECONDS == hour:
+                    self._delete(i)
+                    removed += 1
+        return removed
+
+    # ------------------------------------------------------------
+    # Ikkilik format
+    # ------------------------------------------------------------
+
+    def to_bytes(self):
+        """Jadvalning ikkilik nusxasi (snapshot uchun)"""
+        parts = [TABLE_HEADER.pack(self._slots, self._size)]
+        for name, _ in _FIELDS:
+            field = getattr(self, name)
+            if sys.byteorder == "big":
+                field = array(field.typecode, field)
+                field.byteswap()
+            parts.append(field.tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data, capacity, hours=24, simhash_threshold=3):
+        """
+        Snapshot'dan jadval
+
+        `capacity` fayldagidan kichik bo'lsa, eng yangi yozuvlar qoldiriladi.
+        """
+        table = cls(capacity, hours, simhash_threshold)
+        slots, size = TABLE_HEADER.unpack_from(data, 0)
+        offset = TABLE_HEADER.size
+
+        view = memoryview(data)
+        table._allocate(slots)
+        for name, code in _FIELDS:
+            field = array(code)
+            length = slots * field.itemsize
+            field.frombytes(view[offset:offset + length])
+            if sys.byteorder == "big":
+                field.byteswap()
+            setattr(table, name, field)
+            offset += length
+        table._size = size
+
+        positions = table._live_positions()
+        if len(positions) > table.capacity:
+            timestamps = table._timestamps
+            positions.sort(key=lambda i: timestamps[i])
+            positions = positions[-table.capacity:]
+        slots = min(max(_slots_for(len(positions)), MIN_SLOTS), table._max_slots)
+        table._rebuild(slots, positions)
+
+        simhashes, keys = table._simhashes, table._keys
+        for i in range(table._slots):
+            if keys[i]:
+                table._track_hour(keys[i], table._timestamps[i])
+            if keys[i] and simhashes[i]:
+                if table._near is None:
+                    table._near = SimHashIndex(simhash_threshold, table._simhash_of)
+                table._near.add(simhashes[i], keys[i])
+        return table
+
+
+def write_tables(path, tables):
+    """
+    Snapshot faylini yozish
+
+    Args:
+        path: Fayl yo'li
+        tables: {kalit: FingerprintTable.to_bytes()}
+    """
+    with open(path, "wb") as f:
+        f.write(FILE_HEADER.pack(FILE_MAGIC, len(tables)))
+        for key, data in tables.items():
+            encoded = key.encode("utf-8")
+            f.write(KEY_HEADER.pack(len(encoded)))
+            f.write(encoded + b"\0" * (-len(encoded) % 8))
+            f.write(TABLE_LENGTH.pack(len(data)))
+            f.write(data + b"\0" * (-len(data) % 8))
+
+
+def read_tables(path):
+    """
+    Snapshot faylini o'qish (bitta f.read())
+
+    Returns:
+        {kalit: jadval baytlari (memoryview bo'lagi, nusxasiz)}
+        (fayl yo'q yoki bo'sh bo'lsa - {})
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return {}
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    magic, count = FILE_HEADER.unpack_from(data, 0)
+    if magic != FILE_MAGIC:
+        raise ValueError(f"Noma'lum fayl formati: {path}")
+
+    view = memoryview(data)
+    tables = {}
+    offset = FILE_HEADER.size
+    for _ in range(count):
+        (key_length,) = KEY_HEADER.unpack_from(data, offset)
+        offset += KEY_HEADER.size
+        key = data[offset:offset + key_length].decode("utf-8")
+        offset += key_length + (-key_length % 8)
+        (length,) = TABLE_LENGTH.unpack_from(data, offset)
+        offset += TABLE_LENGTH.size
+        tables[key] = view[offset:offset + length]
+        offset += length + (-length % 8)
+    return tables
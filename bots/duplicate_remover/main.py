@@ -5,20 +5,38 @@ Vazifasi:
 - Target guruhlardagi takroriy habarlarni aniqlash
 - Birinchi habarni saqlash, keyingilari o'chirish
 - Message hash asosida ishlaydi (text + media fayl ID)
+- Ixtiyoriy: deyarli bir xil xabarlar ham (SimHash, NEAR_DUPLICATE_ENABLED)
+- Dublikatlar chat bo'yicha yig'ilib, bitta deleteMessages bilan o'chiriladi
+- Ixtiyoriy: barcha target guruhlar bo'yicha bitta indeks (DUPLICATE_SCOPE=global)
+- Hashlar 64-bitli son sifatida ixcham jadvalda, diskda ikkilik formatda
 
 Author: Abdumajid
 """
 
 import asyncio
+import atexit
 import hashlib
+import json
 import time
 from datetime import datetime, timedelta
 from aiogram import Bot, Dispatcher, types, F
 from aiogram.filters import Command
 from aiogram.fsm.storage.memory import MemoryStorage
-from core.config import DUPLICATE_REMOVER_TOKEN, ADMIN_IDS
-from core.storage import load_state
-import json
+from core.config import (
+    DUPLICATE_REMOVER_TOKEN,
+    ADMIN_IDS,
+    NEAR_DUPLICATE_ENABLED,
+    NEAR_DUPLICATE_THRESHOLD,
+    DUPLICATE_DELETE_WINDOW,
+    DUPLICATE_SCOPE,
+    DUPLICATE_GLOBAL_MAX_HASHES,
+    DUPLICATE_GROUP_CAPACITY,
+)
+from core.storage import get_state_snapshot
+from bots.duplicate_remover.simhash import simhash
+from bots.duplicate_remover.fingerprint_table import FingerprintTable, read_tables, write_tables
+from bots.duplicate_remover.cache_log import ChangeLog
+from bots.duplicate_remover.delete_batcher import DeleteBatcher
 import os
 
 # Bot va Dispatcher
@@ -26,47 +44,157 @@ bot = Bot(token=DUPLICATE_REMOVER_TOKEN)
 storage = MemoryStorage()
 dp = Dispatcher(storage=storage)
 
+# Dublikatlar chat bo'yicha yig'ilib, deleteMessages bilan o'chiriladi
+delete_batcher = DeleteBatcher(bot, window=DUPLICATE_DELETE_WINDOW)
+
 # ============================================================
 # MESSAGE HASH STORAGE
 # ============================================================
-# Format: {group_id: {message_hash: {"first_message_id": int, "timestamp": float, "count": int}}}
+# Format: {group_id: FingerprintTable} - 64-bitli barmoq izlari jadvali
+# Yozuv: first_message_id, timestamp, count, simhash (ixtiyoriy),
+#        chat_id (faqat global rejimda - birinchi xabar qaysi guruhda)
 message_hashes = {}
 
-# Tozalash vaqti: 24 soat (eski xashlar avtomatik o'chiriladi)
+# DUPLICATE_SCOPE=global: barcha target guruhlar shu kalit ostidagi bitta jadvalda
+GLOBAL_SCOPE_KEY = "*"
+
+# Tozalash vaqti: 24 soat
 HASH_EXPIRY_HOURS = 24
 
-# Duplicate cache file
-DUPLICATE_CACHE_FILE = "data/duplicate_cache.json"
+# Duplicate cache: ikkilik snapshot + append-only o'zgarishlar jurnali
+DUPLICATE_CACHE_FILE = "data/duplicate_cache.bin"
+DUPLICATE_LOG_FILE = "data/duplicate_cache.log"
+# Eski JSON cache (bir marta ko'chiriladi)
+LEGACY_CACHE_FILE = "data/duplicate_cache.json"
+
+# Jurnalga yozish oralig'i (soniya)
+DUPLICATE_FLUSH_INTERVAL = 2
+# Snapshot (compaction) oralig'i (soniya) yoki jurnal shu hajmga yetganda
+DUPLICATE_COMPACT_INTERVAL = 600
+DUPLICATE_COMPACT_OPS = 50000
+
+cache_log = ChangeLog(DUPLICATE_CACHE_FILE, DUPLICATE_LOG_FILE,
+                      read_snapshot=read_tables, write_snapshot=write_tables)
 
 
 def load_duplicate_cache():
-    """Cache'ni fayldan yuklash"""
+    """Cache'ni yuklash: snapshot + jurnalni qayta o'ynash"""
     global message_hashes
+    message_hashes = {}
     try:
-        if os.path.exists(DUPLICATE_CACHE_FILE):
-            with open(DUPLICATE_CACHE_FILE, 'r', encoding='utf-8') as f:
-                message_hashes = json.load(f)
-            print(f"[OK] Duplicate cache yuklandi: {len(message_hashes)} guruh")
+        snapshot, ops = cache_log.load()
+
+        for group_id, data in snapshot.items():
+            message_hashes[group_id] = FingerprintTable.from_bytes(
+                data, _table_capacity(group_id), HASH_EXPIRY_HOURS, NEAR_DUPLICATE_THRESHOLD
+            )
+
+        # Eski JSON cache - jurnal undan keyingi o'zgarishlarni saqlaydi
+        legacy = not os.path.exists(DUPLICATE_CACHE_FILE) and os.path.exists(LEGACY_CACHE_FILE)
+        if legacy:
+            with open(LEGACY_CACHE_FILE, 'r', encoding='utf-8') as f:
+                for group_id, group_hashes in json.load(f).items():
+                    for msg_hash, hash_data in group_hashes.items():
+                        apply_change({"op": "add", "g": group_id, "h": msg_hash, "d": hash_data})
+
+        for op in ops:
+            apply_change(op)
+
+        cleanup_old_hashes()
+
+        if legacy:
+            save_duplicate_cache()
+            print(f"[OK] Eski JSON cache ikkilik formatga ko'chirildi: {DUPLICATE_CACHE_FILE}")
+
+        if snapshot or ops or legacy:
+            print(f"[OK] Duplicate cache yuklandi: {len(message_hashes)} guruh "
+                  f"(jurnaldan {len(ops)} ta o'zgarish)")
         else:
-            message_hashes = {}
             print("[INFO] Yangi duplicate cache yaratildi")
     except Exception as e:
         print(f"[OGOHLANTIRISH] Cache yuklash xatolik: {e}")
         message_hashes = {}
 
 
+def legacy_fingerprint(msg_hash):
+    """Eski hex MD5 hash -> 64-bitli barmoq izi (get_message_hash bilan bir xil)"""
+    return int(msg_hash[:16], 16) or 1
+
+
+def apply_change(op):
+    """
+    Jurnal yozuvini xotiradagi cache'ga qo'llash (qayta o'ynash)
+
+    Eski format ("h" - hex hash, "d" - dict) ham qabul qilinadi.
+    """
+    global message_hashes
+    kind = op.get("op")
+    if kind == "add":
+        table = get_group_table(op["g"])
+        if "h" in op:
+            hash_data = op["d"]
+            fingerprint = legacy_fingerprint(op["h"])
+            table.add(fingerprint, hash_data["first_message_id"], hash_data["timestamp"],
+                      hash_data.get("chat_id", 0), hash_data.get("simhash", 0))
+            table.set_count(fingerprint, hash_data.get("count", 0))
+        else:
+            table.add(op["f"], op["m"], op["t"], op.get("ch", 0), op.get("s", 0))
+    elif kind == "count":
+        table = message_hashes.get(op["g"])
+        if table is not None:
+            fingerprint = op["f"] if "f" in op else legacy_fingerprint(op["h"])
+            table.set_count(fingerprint, op["c"])
+    elif kind == "clear":
+        message_hashes = {}
+
+
+def _table_capacity(group_id):
+    return DUPLICATE_GLOBAL_MAX_HASHES if group_id == GLOBAL_SCOPE_KEY else DUPLICATE_GROUP_CAPACITY
+
+
+def get_group_table(group_id):
+    """Guruh barmoq izlari jadvali (yo'q bo'lsa yaratiladi)"""
+    table = message_hashes.get(group_id)
+    if table is None:
+        table = message_hashes[group_id] = FingerprintTable(
+            _table_capacity(group_id), HASH_EXPIRY_HOURS, NEAR_DUPLICATE_THRESHOLD
+        )
+    return table
+
+
+def get_message_text(message: types.Message):
+    """Xabar matni yoki caption (near-duplicate uchun)"""
+    return message.text or message.caption or ""
+
+
+def _build_snapshot():
+    """To'liq holat nusxasi (compaction uchun, loop'da olinadi)"""
+    return {group_id: table.to_bytes() for group_id, table in message_hashes.items()}
+
+
 def save_duplicate_cache():
-    """Cache'ni faylga saqlash"""
+    """Cache'ni darhol to'liq saqlash (snapshot + jurnalni tozalash, sinxron)"""
     try:
-        with open(DUPLICATE_CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(message_hashes, f, ensure_ascii=False, indent=2)
+        cache_log.compact_sync(_build_snapshot)
     except Exception as e:
         print(f"[OGOHLANTIRISH] Cache saqlash xatolik: {e}")
 
 
-def get_message_hash(message: types.Message) -> str:
+def flush_duplicate_log():
+    """Navbatdagi o'zgarishlarni jurnalga yozish (shutdown uchun, sinxron)"""
+    try:
+        cache_log.flush_sync()
+    except Exception as e:
+        print(f"[OGOHLANTIRISH] Cache jurnali yozilmadi: {e}")
+
+
+# Dastur to'xtaganda yozilmagan o'zgarishlarni saqlash
+atexit.register(flush_duplicate_log)
+
+
+def get_message_hash(message: types.Message) -> int:
     """
-    Xabar uchun unikal hash yaratish
+    Xabar uchun unikal hash yaratish (64-bitli barmoq izi, MD5 ning birinchi 8 bayti)
 
     Hash komponentlari:
     - Text matn (agar mavjud bo'lsa)
@@ -111,32 +239,26 @@ def get_message_hash(message: types.Message) -> str:
         return None
 
     hash_string = "|".join(components)
-    return hashlib.md5(hash_string.encode()).hexdigest()
+    # 0 - jadvalda bo'sh slot belgisi
+    return int.from_bytes(hashlib.md5(hash_string.encode()).digest()[:8], "big") or 1
 
 
 def cleanup_old_hashes():
     """24 soatdan eski xashlarni tozalash"""
-    global message_hashes
     current_time = time.time()
-    expiry_seconds = HASH_EXPIRY_HOURS * 3600
 
     cleaned_count = 0
     for group_id in list(message_hashes.keys()):
-        group_hashes = message_hashes[group_id]
-
-        # Eski xashlarni o'chirish
-        for msg_hash in list(group_hashes.keys()):
-            if current_time - group_hashes[msg_hash]["timestamp"] > expiry_seconds:
-                del group_hashes[msg_hash]
-                cleaned_count += 1
+        table = message_hashes[group_id]
+        cleaned_count += table.evict(current_time)
 
         # Bo'sh guruhni o'chirish
-        if not group_hashes:
+        if not len(table):
             del message_hashes[group_id]
 
+    # Eskirganlar jurnalga yozilmaydi - keyingi snapshot'ga kirmaydi
     if cleaned_count > 0:
         print(f"[CLEANUP] {cleaned_count} ta eski hash o'chirildi")
-        save_duplicate_cache()
 
 
 # ============================================================
@@ -147,17 +269,17 @@ def cleanup_old_hashes():
 async def handle_group_message(message: types.Message):
     """Guruh xabarlarini tekshirish va takroriylarni o'chirish"""
 
-    # Faqat target guruhlarda ishlash
-    state_data = load_state()
-    target_groups = state_data.get("target_groups", [])
-
-    # Group ID ni string formatga o'tkazish (target_groups list'ida string formatda)
-    group_id_str = str(message.chat.id)
-
-    if group_id_str not in target_groups:
+    # Faqat target guruhlarda ishlash (xotiradagi snapshot - diskdan o'qilmaydi)
+    if message.chat.id not in get_state_snapshot().target_ids:
         # Bu target guruh emas, ignore qilish
         return
 
+    # Jadval kaliti: guruh ID (string) yoki global rejimda umumiy kalit
+    if DUPLICATE_SCOPE == "global":
+        scope_key = GLOBAL_SCOPE_KEY
+    else:
+        scope_key = str(message.chat.id)
+
     # Message hash yaratish
     msg_hash = get_message_hash(message)
 
@@ -165,30 +287,47 @@ async def handle_group_message(message: types.Message):
         # Hash yaratib bo'lmadi (bo'sh xabar)
         return
 
-    # Group uchun hash storage yaratish (agar yo'q bo'lsa)
-    if group_id_str not in message_hashes:
-        message_hashes[group_id_str] = {}
-
-    group_hashes = message_hashes[group_id_str]
+    # Group (yoki global) barmoq izlari jadvali (agar yo'q bo'lsa yaratiladi)
+    table = get_group_table(scope_key)
+
+    # Aniq moslik bo'lmasa - deyarli bir xil xabarni qidirish (SimHash)
+    original_hash = msg_hash
+    original = table.get(msg_hash)
+    simhash_value = None
+    if original is None and NEAR_DUPLICATE_ENABLED:
+        simhash_value = simhash(get_message_text(message))
+        if simhash_value is not None:
+            near_hash = table.find_near(simhash_value)
+            if near_hash is not None:
+                original = table.get(near_hash)
+                if original is not None:
+                    original_hash = near_hash
 
     # Hash mavjudligini tekshirish
-    if msg_hash in group_hashes:
+    if original is not None:
         # DUPLICATE topildi!
-        first_msg_id = group_hashes[msg_hash]["first_message_id"]
-        duplicate_count = group_hashes[msg_hash]["count"]
+        first_msg_id = original.first_message_id
 
         try:
-            # Takroriy xabarni o'chirish
-            await bot.delete_message(message.chat.id, message.message_id)
-
-            # Statistikani yangilash
-            group_hashes[msg_hash]["count"] += 1
-            save_duplicate_cache()
-
-            print(f"[DUPLICATE] Guruh: {message.chat.title or message.chat.id}")
+            # Takroriy xabarni o'chirish (batch tugaguncha kutiladi)
+            await delete_batcher.delete(message.chat.id, message.message_id)
+
+            # Statistikani yangilash (batch muvaffaqiyatli tugagandan keyin)
+            duplicate_count = table.increment(original_hash)
+            if duplicate_count is not None:
+                cache_log.append({"op": "count", "g": scope_key, "f": original_hash, "c": duplicate_count})
+            else:
+                # Kutish paytida yozuv jadvaldan chiqarilgan
+                duplicate_count = original.count + 1
+
+            kind = "DUPLICATE" if original_hash == msg_hash else "NEAR-DUPLICATE"
+            print(f"[{kind}] Guruh: {message.chat.title or message.chat.id}")
             print(f"  └─ O'chirildi: #{message.message_id}")
-            print(f"  └─ Birinchi xabar: #{first_msg_id}")
-            print(f"  └─ Jami dublikatlar: {duplicate_count + 1}")
+            if original.chat_id and original.chat_id != message.chat.id:
+                print(f"  └─ Birinchi xabar: #{first_msg_id} (guruh {original.chat_id})")
+            else:
+                print(f"  └─ Birinchi xabar: #{first_msg_id}")
+            print(f"  └─ Jami dublikatlar: {duplicate_count}")
 
         except Exception as e:
             print(f"[X] Xabar o'chirishda xatolik: {e}")
@@ -197,13 +336,14 @@ async def handle_group_message(message: types.Message):
                 print(f"[OGOHLANTIRISH] Bot '{message.chat.title}' guruhda admin emas!")
 
     else:
-        # YANGI xabar - hash'ni saqlash
-        group_hashes[msg_hash] = {
-            "first_message_id": message.message_id,
-            "timestamp": time.time(),
-            "count": 0  # Hali dublikat yo'q
-        }
-        save_duplicate_cache()
+        # YANGI xabar - hash'ni saqlash (hali dublikat yo'q)
+        op = {"op": "add", "g": scope_key, "f": msg_hash, "m": message.message_id, "t": int(time.time())}
+        if simhash_value is not None:
+            op["s"] = simhash_value
+        if scope_key == GLOBAL_SCOPE_KEY:
+            op["ch"] = message.chat.id
+        table.add(msg_hash, op["m"], op["t"], op.get("ch", 0), op.get("s", 0))
+        cache_log.append(op)
 
 
 # ============================================================
@@ -235,14 +375,12 @@ async def cmd_stats(message: types.Message):
         return
 
     total_groups = len(message_hashes)
-    total_hashes = sum(len(group_hashes) for group_hashes in message_hashes.values())
-    total_duplicates = sum(
-        sum(hash_data["count"] for hash_data in group_hashes.values())
-        for group_hashes in message_hashes.values()
-    )
+    total_hashes = sum(len(table) for table in message_hashes.values())
+    total_duplicates = sum(table.total_count() for table in message_hashes.values())
 
     stats_text = (
         "📊 <b>Duplicate Remover Statistikasi</b>\n\n"
+        f"🌐 Doira: {DUPLICATE_SCOPE}\n"
         f"👥 Guruhlar: {total_groups}\n"
         f"🔑 Unikal xabarlar: {total_hashes}\n"
         f"🗑 O'chirilgan dublikatlar: {total_duplicates}\n\n"
@@ -251,10 +389,13 @@ async def cmd_stats(message: types.Message):
     # Har bir guruh uchun detallari
     if message_hashes:
         stats_text += "<b>Guruhlar bo'yicha:</b>\n"
-        for group_id, group_hashes in message_hashes.items():
-            group_duplicates = sum(hash_data["count"] for hash_data in group_hashes.values())
-            stats_text += f"\n• Guruh {group_id}:\n"
-            stats_text += f"  └─ Unikal: {len(group_hashes)}, O'chirilgan: {group_duplicates}\n"
+        for group_id, table in message_hashes.items():
+            group_duplicates = table.total_count()
+            if group_id == GLOBAL_SCOPE_KEY:
+                stats_text += "\n• Barcha target guruhlar (global):\n"
+            else:
+                stats_text += f"\n• Guruh {group_id}:\n"
+            stats_text += f"  └─ Unikal: {len(table)}, O'chirilgan: {group_duplicates}\n"
 
     await message.answer(stats_text, parse_mode="HTML")
 
@@ -266,10 +407,10 @@ async def cmd_clear(message: types.Message):
         return
 
     global message_hashes
-    old_count = sum(len(group_hashes) for group_hashes in message_hashes.values())
+    old_count = sum(len(table) for table in message_hashes.values())
 
     message_hashes = {}
-    save_duplicate_cache()
+    cache_log.append({"op": "clear"})
 
     await message.answer(
         f"✅ Cache tozalandi\n\n"
@@ -297,6 +438,26 @@ async def cmd_cleanup(message: types.Message):
 # BACKGROUND TASKS
 # ============================================================
 
+async def run_duplicate_cache_writer():
+    """Fon writer: jurnalga davriy yozish va vaqti-vaqti bilan compaction"""
+    last_compact = time.monotonic()
+    try:
+        while True:
+            await asyncio.sleep(DUPLICATE_FLUSH_INTERVAL)
+            try:
+                if (time.monotonic() - last_compact >= DUPLICATE_COMPACT_INTERVAL
+                        or cache_log.log_size >= DUPLICATE_COMPACT_OPS):
+                    await cache_log.compact(_build_snapshot)
+                    last_compact = time.monotonic()
+                else:
+                    await cache_log.flush()
+            except Exception as e:
+                print(f"[OGOHLANTIRISH] Duplicate cache yozish xatolik: {e}")
+    finally:
+        # To'xtatilganda (cancel) oxirgi o'zgarishlarni yozish
+        flush_duplicate_log()
+
+
 async def periodic_cleanup():
     """Har 1 soatda eski hashlarni tozalash"""
     while True:
@@ -318,6 +479,9 @@ async def run_duplicate_remover_bot():
     # Periodic cleanup task
     asyncio.create_task(periodic_cleanup())
 
+    # Cache o'zgarishlarini fonda yozish (write-behind)
+    asyncio.create_task(run_duplicate_cache_writer())
+
     print("[OK] Duplicate Remover Bot ulandi")
     print("[INFO] Target guruhlardagi takroriy xabarlar avtomatik o'chiriladi")
 
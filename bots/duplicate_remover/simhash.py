@@ -0,0 +1,197 @@
+"""
+SimHash - deyarli bir xil (near-duplicate) xabarlarni aniqlash
+
+Haydovchilar bitta e'lonni kichik o'zgarishlar bilan qayta yuboradi
+(boshqa emoji, telefon raqami bo'shliqlari, oxirgi nuqta). Aniq MD5 hash
+bunday xabarlarni ushlamaydi.
+
+- Matn normallashtiriladi (kirill -> lotin, emoji/belgilar olib tashlanadi,
+  raqamlar orasidagi bo'shliq va chiziqchalar birlashtiriladi)
+- So'z juftliklari (shingle) bo'yicha 64-bitli SimHash hisoblanadi
+- Qidiruv LSH banded indeks orqali: k ta farqli bit uchun 64 bit k+1 ta
+  bandga bo'linadi - k tagacha farq qilgan barmoq izlari kamida bitta bandda
+  to'liq mos keladi (Dirixle prinsipi), shuning uchun faqat shu band
+  "savatidagi" nomzodlar tekshiriladi
+"""
+
+import hashlib
+import re
+from array import array
+
+from core.text_normalize import normalize_text
+
+# Bundan kam so'zli xabarlar uchun SimHash hisoblanmaydi (qisqa xabarlar
+# "Salom", "Bor" - bir-biriga juda o'xshash, noto'g'ri moslik beradi)
+MIN_WORDS = 5
+
+_MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+# Raqamlar orasidagi bo'shliq, chiziqcha, qavs: "90 123-45 67" -> "901234567"
+_DIGIT_GAP_RE = re.compile(r"(?<=\d)[\s\-().]+(?=\d)")
+_WORD_RE = re.compile(r"\w+")
+
+
+def _tokens(text):
+    text = _DIGIT_GAP_RE.sub("", normalize_text(text))
+    return _WORD_RE.findall(text)
+
+
+def _feature_hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+
+
+def simhash(text):
+    """
+    Matnning 64-bitli SimHash'i
+
+    Returns:
+        int yoki None (matn juda qisqa)
+    """
+    tokens = _tokens(text)
+    if len(tokens) < MIN_WORDS:
+        return None
+
+    # So'z juftliklari - so'zlar tartibi ham hisobga olinadi
+    features = [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    weights = [0] * 64
+    for feature in features:
+        h = _feature_hash(feature)
+        for bit in range(64):
+            if h >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    """Ikki barmoq izi orasidagi farqli bitlar soni"""
+    return bin((a ^ b) & _MASK_64).count("1")
+
+
+class SimHashIndex:
+    """
+    LSH banded indeks - Hamming masofasi `threshold` gacha bo'lgan
+    barmoq izlarini topish
+
+    Kalitlar 64-bitli butun sonlar. Har yozuv bitta tugun: kalit (array('Q'),
+    8 bayt) va har band uchun keyingi tugun havolasi (array('i'), 4 bayt).
+    Band qiymati bo'yicha zanjir boshlari ham array('i') - alohida Python
+    obyektlari yaratilmaydi. SimHash qiymatining o'zi saqlanmaydi, u
+    `fingerprint_of(key)` orqali egasidan (FingerprintTable) olinadi.
+
+    Ishlatish:
+        index = SimHashIndex(threshold=3, fingerprint_of=table_simhash)
+        index.add(fingerprint, key)
+        key = index.find(fingerprint)
+    """
+
+    def __init__(self, threshold=3, fingerprint_of=None):
+        self.threshold = threshold
+        # key -> SimHash yoki None (kalit endi yo'q)
+        self._fingerprint_of = fingerprint_of
+
+        # 64 bit threshold+1 ta bandga bo'linadi: [(siljish, niqob), ...]
+        band_count = threshold + 1
+        self._bands = []
+        start = 0
+        for i in range(band_count):
+            width = 64 // band_count + (1 if i < 64 % band_count else 0)
+            self._bands.append((start, (1 << width) - 1))
+            start += width
+
+        # Tugunlar: kalit (0 = bo'sh tugun) va har band uchun keyingi tugun
+        self._keys = array("Q")
+        self._next = [array("i") for _ in self._bands]
+        self._free = -1    # Bo'sh tugunlar ro'yxati (_next[0] orqali bog'langan)
+        self._size = 0
+        # Eng tor band qiymatlari sonidan ko'p zanjir boshi kerak emas
+        self._max_heads = min(mask for _, mask in self._bands) + 1
+        self._resize_heads(64)
+
+    def _band_values(self, fingerprint):
+        return [(fingerprint >> shift) & mask for shift, mask in self._bands]
+
+    def _resize_heads(self, size):
+        """Zanjir boshlarini qayta qurish (tugunlar o'z joyida qoladi)"""
+        self._mask = size - 1
+        self._heads = [array("i", [-1]) * size for _ in self._bands]
+        self._free = -1
+        for node in range(len(self._keys) - 1, -1, -1):
+            key = self._keys[node]
+            if key:
+                self._link(node, self._fingerprint_of(key))
+            else:
+                self._next[0][node] = self._free
+                self._free = node
+
+    def _link(self, node, fingerprint):
+        for heads, nexts, value in zip(self._heads, self._next, self._band_values(fingerprint)):
+            slot = value & self._mask
+            nexts[node] = heads[slot]
+            heads[slot] = node
+
+    def add(self, fingerprint, key):
+        if self._free >= 0:
+            node = self._free
+            self._free = self._next[0][node]
+            self._keys[node] = key
+        else:
+            node = len(self._keys)
+            self._keys.append(key)
+            for nexts in self._next:
+                nexts.append(-1)
+        self._size += 1
+
+        if self._size > len(self._heads[0]) < self._max_heads:
+            # Qayta qurishda yangi tugun ham bog'lanadi
+            self._resize_heads(len(self._heads[0]) * 2)
+        else:
+            self._link(node, fingerprint)
+
+    def remove(self, fingerprint, key):
+        node = -1
+        for heads, nexts, value in zip(self._heads, self._next, self._band_values(fingerprint)):
+            slot = value & self._mask
+            prev, node = -1, heads[slot]
+            while node >= 0 and self._keys[node] != key:
+                prev, node = node, nexts[node]
+            if node < 0:
+                return
+            if prev < 0:
+                heads[slot] = nexts[node]
+            else:
+                nexts[prev] = nexts[node]
+
+        self._keys[node] = 0
+        self._next[0][node] = self._free
+        self._free = node
+        self._size -= 1
+
+    def find(self, fingerprint):
+        """
+        Eng yaqin barmoq izining kalitini topish
+
+        Returns:
+            key yoki None (threshold ichida hech narsa yo'q)
+        """
+        best_key = None
+        best_distance = self.threshold + 1
+        for heads, nexts, value in zip(self._heads, self._next, self._band_values(fingerprint)):
+            node = heads[value & self._mask]
+            while node >= 0:
+                key = self._keys[node]
+                node = nexts[node]
+                candidate = self._fingerprint_of(key)
+                if candidate is None:
+                    continue
+                distance = hamming_distance(fingerprint, candidate)
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+        return best_key
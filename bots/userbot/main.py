@@ -1,7 +1,6 @@
-import re
 import asyncio
 from datetime import datetime
-from telethon import TelegramClient, events
+from telethon import TelegramClient, events, utils
 from telethon.tl.types import (
     UpdateNewMessage,
     UpdateNewChannelMessage,
@@ -9,9 +8,13 @@ from telethon.tl.types import (
     Message,
     MessageEntityPhone
 )
-from core.storage import save_state, load_state
-from core.config import USERBOT_API_ID, USERBOT_API_HASH, session_path
-from core.user_cache import get_user_display_info, add_user_to_cache
+from core.storage import save_state, load_state, get_state_snapshot
+from core.config import USERBOT_API_ID, USERBOT_API_HASH, session_path, REBUILD_CONCURRENCY
+from core.user_cache import get_user_display_info, add_user_to_cache, run_user_cache_writer, expire_user_cache
+from core.keyword_matcher import evaluate_snapshot
+from core.rate_limit import call_with_flood_wait
+from services.delivery import DeliveryQueue, PRIORITY_FAST, PRIORITY_NORMAL
+from services.participant_sync import ParticipantSync
 
 # TEZLIK UCHUN: uvloop event loop (agar mavjud bo'lsa)
 try:
@@ -25,56 +28,18 @@ except ImportError:
 client = TelegramClient(session_path, USERBOT_API_ID, USERBOT_API_HASH)
 handler_registered = False
 
+# Target/buffer guruhlarga yetkazish navbati (rate limit + FloodWait + priority)
+delivery = DeliveryQueue(client)
+
 # [FAST] CACHE: Tezlik uchun source guruhlarni xotirada saqlash
+# group_info: {"id", "username", "title", "original_key", "entity", "input_peer", "resolved_at"}
+# Handler chat entity'sini shu yerdan oladi - get_entity() kutilmaydi
 source_groups_cache = {
     "fast": {},      # {chat_id: group_info}
     "normal": {}     # {chat_id: group_info}
 }
 
 
-def check_keyword_match(text, keywords):
-    """Kalit so'zlarni tekshirish - OPTIMIZATSIYA QILINGAN"""
-    if not text:
-        return None
-
-    text_lower = text.lower()
-
-    # 1. Ko'p so'zli kalit so'zlar (tez tekshirish)
-    for kw in keywords:
-        if ' ' in kw and kw in text_lower:
-            return kw
-
-    # 2. Bitta so'zli kalit so'zlar
-    words = set(re.findall(r'\b\w+\b', text_lower))
-    for kw in keywords:
-        if ' ' not in kw and kw in words:
-            return kw
-
-    return None
-
-
-def check_blackword(text, blackwords):
-    """Qora ro'yxat so'zlarini tekshirish"""
-    if not text or not blackwords:
-        return None
-    
-    text_lower = text.lower()
-    
-    # Qora ro'yxat so'zlarini tekshirish
-    for bw in blackwords:
-        if ' ' in bw:
-            # Ko'p so'zli blackword
-            if bw in text_lower:
-                return bw
-        else:
-            # Bitta so'zli blackword
-            words = set(re.findall(r'\b\w+\b', text_lower))
-            if bw in words:
-                return bw
-    
-    return None
-
-
 def get_quick_user_info(message):
     """
     [FAST] TEZKOR user ma'lumotlarini olish - faqat message obyektidan
@@ -219,66 +184,124 @@ async def update_source_groups():
     print(f"[OK] {len(new_sources)} ta guruh yangilandi")
 
 
+async def _resolve_source_group(group, semaphore):
+    """Bitta source guruhni olish: (group_type, group_info) yoki None"""
+    if isinstance(group, dict):
+        group_id = group.get("id")
+        group_type = group.get("type", "normal")
+    else:
+        group_id = group
+        group_type = "normal"
+
+    try:
+        # Guruhni olish (parallel so'rovlar soni cheklangan)
+        async with semaphore:
+            entity = await call_with_flood_wait(client.get_entity, group_id)
+    except Exception as e:
+        print(f"[OGOHLANTIRISH]  Guruhni yuklab bo'lmadi: {group_id} - {e}")
+        return None
+
+    group_info = {
+        "id": entity.id,
+        "username": getattr(entity, 'username', None),
+        "title": getattr(entity, 'title', None),
+        "original_key": group_id,
+        "entity": entity,
+        "input_peer": utils.get_input_peer(entity),
+        "resolved_at": datetime.now()
+    }
+    return group_type, group_info
+
+
+async def _warm_up_fast_group(group_info, semaphore):
+    """[FAST] FAST guruh uchun oxirgi xabarlarni o'qish (userlar Telethon cache'ga tushadi)"""
+    group_id = group_info["original_key"]
+
+    async def iterate_messages():
+        # Oxirgi 100 ta xabarni olish (userlar cache'ga tushadi)
+        async for message in client.iter_messages(group_info["entity"], limit=100):
+            pass  # Faqat iterate qilish - cache'ga tushadigan userlar
+
+    try:
+        print(f"[YUKLASH] {group_id} guruhidan userlarni cache'ga yuklash...")
+        async with semaphore:
+            await call_with_flood_wait(iterate_messages)
+        print(f"[OK] {group_id} cache'ga yuklandi")
+    except Exception as e:
+        print(f"[OGOHLANTIRISH] Cache yuklash xatolik {group_id}: {e}")
+
+
 async def rebuild_cache():
-    """Cache'ni qayta qurish - TEZLIK UCHUN"""
+    """
+    Cache'ni qayta qurish - TEZLIK UCHUN
+
+    Guruhlar parallel (REBUILD_CONCURRENCY tagacha) olinadi. Yangi cache alohida
+    quriladi va bir martada almashtiriladi - handler hech qachon yarim
+    tozalangan cache'ni ko'rmaydi.
+    """
     global source_groups_cache
 
     state = load_state()
     source_groups = state.get("source_groups", [])
 
-    # Cache'ni tozalash
-    source_groups_cache = {"fast": {}, "normal": {}}
+    semaphore = asyncio.Semaphore(REBUILD_CONCURRENCY)
+    results = await asyncio.gather(
+        *(_resolve_source_group(group, semaphore) for group in source_groups)
+    )
 
-    for group in source_groups:
-        if isinstance(group, dict):
-            group_id = group.get("id")
-            group_type = group.get("type", "normal")
-        else:
-            group_id = group
-            group_type = "normal"
-
-        try:
-            # Guruhni olish
-            entity = await client.get_entity(group_id)
-            chat_id = entity.id
-            username = getattr(entity, 'username', None)
-
-            group_info = {
-                "id": chat_id,
-                "username": username,
-                "original_key": group_id
-            }
-
-            # Cache'ga qo'shish
-            source_groups_cache[group_type][chat_id] = group_info
-            
-            # [FAST] QOSIMCHA: FAST guruhlar uchun userlarni cache'ga yuklash
-            if group_type == "fast":
-                try:
-                    print(f"[YUKLASH] {group_id} guruhidan userlarni cache'ga yuklash...")
-                    # Oxirgi 100 ta xabarni olish (userlar cache'ga tushadi)
-                    async for message in client.iter_messages(entity, limit=100):
-                        pass  # Faqat iterate qilish - cache'ga tushadigan userlar
-                    print(f"[OK] {group_id} cache'ga yuklandi")
-                except Exception as e:
-                    print(f"[OGOHLANTIRISH] Cache yuklash xatolik {group_id}: {e}")
+    new_cache = {"fast": {}, "normal": {}}
+    for result in results:
+        if result is None:
+            continue
+        group_type, group_info = result
+        new_cache.setdefault(group_type, {})[group_info["id"]] = group_info
 
-        except Exception as e:
-            print(f"[OGOHLANTIRISH]  Guruhni yuklab bo'lmadi: {group_id} - {e}")
+    # Atomik almashtirish
+    source_groups_cache = new_cache
 
     fast_count = len(source_groups_cache["fast"])
     normal_count = len(source_groups_cache["normal"])
     print(f"[CACHE] Cache: {fast_count} ta fast, {normal_count} ta normal guruh")
 
+    # [FAST] QOSIMCHA: FAST guruhlar uchun userlarni cache'ga yuklash (parallel)
+    await asyncio.gather(
+        *(_warm_up_fast_group(group_info, semaphore) for group_info in new_cache["fast"].values())
+    )
+
+
+async def refresh_group_entity(chat_id, group_type):
+    """Bitta source guruh entity'sini fonda yangilash (cache'da yo'q bo'lsa)"""
+    group_info = source_groups_cache.get(group_type, {}).get(chat_id)
+    if group_info is None:
+        return
+
+    try:
+        entity = await client.get_entity(group_info.get("input_peer") or chat_id)
+        group_info.update({
+            "username": getattr(entity, 'username', None),
+            "title": getattr(entity, 'title', None),
+            "entity": entity,
+            "input_peer": utils.get_input_peer(entity),
+            "resolved_at": datetime.now()
+        })
+    except Exception as e:
+        print(f"[OGOHLANTIRISH] Guruh entity yangilanmadi {chat_id}: {e}")
+
 
 async def handle_fast_message(message, chat, matched_keyword, user_identifier=None):
     """
     [FAST] FAST guruhlar uchun - FAQAT RAW MESSAGE
     user_identifier = username yoki telefon raqami
     """
-    state = load_state()
-    buffer_group = state.get("buffer_group", "")
-    target_groups = state.get("target_groups", [])
+    snapshot = get_state_snapshot()
+    buffer_group = snapshot.buffer_group
+    target_groups = snapshot.target_groups
+
+    # Target guruhlarga yuborish - buffer bilan PARALLEL (buffer'ni kutmaydi)
+    if target_groups:
+        asyncio.create_task(
+            send_to_targets_fast(message, chat, matched_keyword, target_groups, user_identifier)
+        )
 
     # [FAST] DARHOL BUFFER GURUHGA YUBORISH
     if buffer_group:
@@ -311,23 +334,21 @@ async def handle_fast_message(message, chat, matched_keyword, user_identifier=No
             if message.sender_id:
                 buffer_caption += f'👤 <a href="tg://user?id={message.sender_id}">Profilni ochish</a>'
             print(buffer_caption)
-            await client.send_message(
-                entity=buffer_id,
-                message=buffer_caption,
+            result = await delivery.submit(
+                buffer_id,
+                buffer_caption,
+                priority=PRIORITY_FAST,
                 parse_mode='html',
                 link_preview=False
             )
-            print(f"[FAST] FAST → buffer: {user_display}")
+            if result.ok:
+                print(f"[FAST] FAST → buffer: {user_display}")
+            else:
+                print(f"[X] Buffer xatolik: {result.error}")
             
         except Exception as e:
             print(f"[X] Buffer xatolik: {e}")
 
-    # Target guruhlarga yuborish
-    if target_groups:
-        asyncio.create_task(
-            send_to_targets_fast(message, chat, matched_keyword, target_groups, user_identifier)
-        )
-
 
 async def find_and_update_username(sent_msg, message, update, buffer_id):
     """
@@ -377,33 +398,18 @@ async def send_to_targets_fast(message, chat, matched_keyword, target_groups, us
         else:
             caption += "⚠️ User profili topilmadi"
         print(caption)
-        # Target guruhlarga yuborish
-        for target in target_groups:
-            try:
-                target_id = int(target) if isinstance(target, str) and target.lstrip('-').isdigit() else target
-
-                await client.send_message(
-                    entity=target_id,
-                    message=caption,
-                    parse_mode='html',
-                    link_preview=False
-                )
-                print(f"[OK] Target → {target}")
+        # Target guruhlarga PARALLEL yuborish (navbat orqali, FAST ustuvorlik bilan)
+        results = await delivery.fan_out(
+            target_groups,
+            caption,
+            priority=PRIORITY_FAST,
+            parse_mode='html',
+            link_preview=False
+        )
+        for result in results:
+            if result.ok:
+                print(f"[OK] Target → {result.target}")
 
-            except Exception as e:
-                error_msg = str(e)
-                if "can't write" in error_msg.lower() or "chat write forbidden" in error_msg.lower():
-                    print(f"[X] Target {target} yozish huquqi yo'q: {error_msg}")
-                    print(f"    YECHIM: UserBot'ni guruhga admin qiling yoki yozish huquqini bering")
-                elif "no user has" in error_msg.lower() or "user not participant" in error_msg.lower():
-                    print(f"[X] Target {target} UserBot a'zo emas: {error_msg}")
-                    print(f"    YECHIM: UserBot'ni guruhga qo'shing")
-                elif "flood" in error_msg.lower():
-                    print(f"[X] Target {target} FloodWait xatolik: {error_msg}")
-                    print(f"    YECHIM: Biroz kutib, qaytadan urinib ko'ring")
-                else:
-                    print(f"[X] Target xatolik {target}: {error_msg}")
-    
     except Exception as e:
         print(f"[X] send_to_targets_fast xatolik: {e}")
 
@@ -412,8 +418,7 @@ async def handle_normal_message(message, chat, matched_keyword):
     """
     [MATN] NORMAL guruhlar uchun - to'liq ma'lumot bilan
     """
-    state = load_state()
-    target_groups = state.get("target_groups", [])
+    target_groups = get_state_snapshot().target_groups
 
     await format_and_send_to_targets(message, chat, matched_keyword, target_groups, is_fast=False)
 
@@ -477,32 +482,17 @@ async def format_and_send_to_targets(message, chat, matched_keyword, target_grou
         if message.sender_id:
             caption += f'👤 <a href="tg://user?id={message.sender_id}">Profilni ochish</a>'
         print(caption)
-        # Target guruhlarga yuborish
-        for target in target_groups:
-            try:
-                target_id = int(target) if isinstance(target, str) and target.lstrip('-').isdigit() else target
-
-                await client.send_message(
-                    entity=target_id,
-                    message=caption,
-                    parse_mode='html',
-                    link_preview=False
-                )
-                print(f"[OK] Yuborildi → {target}")
-
-            except Exception as e:
-                error_msg = str(e)
-                if "can't write" in error_msg.lower() or "chat write forbidden" in error_msg.lower():
-                    print(f"[X] Target {target} yozish huquqi yo'q: {error_msg}")
-                    print(f"    YECHIM: UserBot'ni guruhga admin qiling yoki yozish huquqini bering")
-                elif "no user has" in error_msg.lower() or "user not participant" in error_msg.lower():
-                    print(f"[X] Target {target} UserBot a'zo emas: {error_msg}")
-                    print(f"    YECHIM: UserBot'ni guruhga qo'shing")
-                elif "flood" in error_msg.lower():
-                    print(f"[X] Target {target} FloodWait xatolik: {error_msg}")
-                    print(f"    YECHIM: Biroz kutib, qaytadan urinib ko'ring")
-                else:
-                    print(f"[X] Target xatolik {target}: {error_msg}")
+        # Target guruhlarga PARALLEL yuborish (navbat orqali)
+        results = await delivery.fan_out(
+            target_groups,
+            caption,
+            priority=PRIORITY_FAST if is_fast else PRIORITY_NORMAL,
+            parse_mode='html',
+            link_preview=False
+        )
+        for result in results:
+            if result.ok:
+                print(f"[OK] Yuborildi → {result.target}")
 
     except Exception as e:
         print(f"[X] Format xatolik: {e}")
@@ -553,29 +543,28 @@ async def setup_raw_handler():
             else:
                 return  # Bu guruh bizning ro'yxatimizda yo'q
 
-            # Kalit so'zni tekshirish
-            state = load_state()
-            keywords = [kw.lower().strip() for kw in state.get("keywords", [])]
-
-            if not keywords:
+            # Kalit so'zni tekshirish (xotiradagi snapshot - diskdan o'qilmaydi)
+            snapshot = get_state_snapshot()
+            if not snapshot.keywords:
                 return
 
-            matched_keyword = check_keyword_match(message.message, keywords)
+            # Kalit so'z + blackword - bitta o'qishda
+            matched_keyword, found_blackword = evaluate_snapshot(message.message, snapshot)
             if not matched_keyword:
                 return
 
             # [OGOHLANTIRISH] BLACKWORD TEKSHIRUVI - agar topilsa, xabarni o'tkazib yuborish
-            blackwords = [bw.lower().strip() for bw in state.get("blackwords", [])]
-            if blackwords:
-                found_blackword = check_blackword(message.message, blackwords)
-                if found_blackword:
-                    print(f"[STOP] Blackword topildi: '{found_blackword}' - xabar o'tkazib yuborildi")
-                    return
+            if found_blackword:
+                print(f"[STOP] Blackword topildi: '{found_blackword}' - xabar o'tkazib yuborildi")
+                return
 
             print(f"[TARGET] Kalit so'z topildi: '{matched_keyword}' [{group_type.upper()}]")
 
-            # Chat entitysini olish
-            chat = await client.get_entity(chat_id)
+            # Chat entitysini cache'dan olish (rebuild_cache'da oldindan olingan)
+            chat = source_groups_cache[group_type][chat_id].get("entity")
+            if chat is None:
+                chat = await client.get_entity(chat_id)
+                asyncio.create_task(refresh_group_entity(chat_id, group_type))
 
             # [FAST] USERNAME yoki TELEFON ni tezkor topish
             user_identifier = None
@@ -682,9 +671,7 @@ async def setup_raw_handler():
 async def load_fast_users_cache():
     """FAST guruhlardan userlarni cache'ga yuklash - UserBot client'ini ishlatadi"""
     try:
-        from telethon.tl.functions.channels import GetParticipantsRequest
-        from telethon.tl.types import ChannelParticipantsSearch
-        from core.user_cache import add_users_bulk, get_cache_stats
+        from core.user_cache import get_cache_stats
 
         print("\n" + "=" * 60)
         print("FAST GURUHLAR USERLARINI CACHE'GA YUKLASH")
@@ -707,81 +694,10 @@ async def load_fast_users_cache():
         print(f"\n[INFO] {len(fast_groups)} ta FAST guruh topildi")
         print("-" * 60)
 
-        all_users = {}
-
-        for i, group_id in enumerate(fast_groups, 1):
-            print(f"\n[{i}/{len(fast_groups)}] {group_id}")
-
-            try:
-                # Guruhni olish (mavjud client ishlatiladi)
-                entity = await client.get_entity(group_id)
-                group_title = getattr(entity, 'title', 'Noma\'lum')
-                print(f"  Nomi: {group_title}")
-
-                # Userlarni olish
-                offset = 0
-                batch_size = 200
-                group_user_count = 0
-
-                while True:
-                    try:
-                        participants = await client(GetParticipantsRequest(
-                            channel=entity,
-                            filter=ChannelParticipantsSearch(''),
-                            offset=offset,
-                            limit=batch_size,
-                            hash=0
-                        ))
-
-                        if not participants.users:
-                            break
-
-                        # Har bir userni qayta ishlash
-                        for user in participants.users:
-                            # Bot'larni o'tkazib yuborish
-                            if user.bot:
-                                continue
-
-                            user_id = str(user.id)
-
-                            user_data = {
-                                'id': user.id,
-                                'first_name': user.first_name or '',
-                                'last_name': user.last_name or '',
-                                'full_name': f"{user.first_name or ''} {user.last_name or ''}".strip() or 'Noma\'lum',
-                                'username': f"@{user.username}" if user.username else None,
-                                'phone': f"+{user.phone}" if user.phone else None,
-                                'is_verified': getattr(user, 'verified', False),
-                                'is_premium': getattr(user, 'premium', False),
-                            }
-
-                            all_users[user_id] = user_data
-                            group_user_count += 1
-
-                        # Keyingi batch
-                        offset += len(participants.users)
-
-                        if len(participants.users) < batch_size:
-                            break
-
-                    except Exception as e:
-                        print(f"  [OGOHLANTIRISH] Batch xatolik (offset={offset}): {e}")
-                        break
-
-                print(f"  ✓ {group_user_count} ta user cache'ga qo'shildi")
-
-            except Exception as e:
-                print(f"  [X] Guruh xatolik: {e}")
-
-            # Rate limiting
-            await asyncio.sleep(1)
-
-        # Barcha userlarni bir vaqtda saqlash
-        if all_users:
-            print(f"\n{'-' * 60}")
-            print(f"[SAQLASH] {len(all_users)} ta user cache'ga yozilmoqda...")
-            add_users_bulk(all_users)
+        # Guruhlar parallel o'qiladi, har sahifa darhol cache'ga yoziladi
+        total_users = await ParticipantSync(client).run(fast_groups)
 
+        if total_users:
             # Statistika
             stats = get_cache_stats()
             print(f"\n{'=' * 60}")
@@ -792,7 +708,7 @@ async def load_fast_users_cache():
             print(f"Telefon bor: {stats['with_phone']}")
             print(f"{'=' * 60}\n")
         else:
-            print("\n[INFO] Cache'ga qo'shiladigan userlar topilmadi")
+            print("\n[INFO] Yangi userlar yo'q (sahifalar o'zgarmagan yoki topilmadi)")
 
     except Exception as e:
         print(f"[OGOHLANTIRISH] User cache yuklash xatolik: {e}")
@@ -813,21 +729,39 @@ async def run_userbot():
     # [YANGI] Startup'da FAST guruhlar cache'ni yuklash
     asyncio.create_task(load_fast_users_cache())
 
-    # Har 30 daqiqada source guruhlar yangilash
+    # User cache'ni fonda davriy faylga yozish (write-behind)
+    cache_writer = asyncio.create_task(run_user_cache_writer())
+
+    # Har 30 daqiqada source guruhlar yangilash va eskirgan userlarni tozalash
     # Har 24 soatda user cache yangilash
     last_cache_update = 0
 
-    while True:
-        await asyncio.sleep(1800)  # 30 daqiqa
-        try:
-            await update_source_groups()
+    try:
+        while True:
+            await asyncio.sleep(1800)  # 30 daqiqa
+            try:
+                await update_source_groups()
 
-            # Har 24 soatda (48 ta 30-daqiqalik interval)
-            last_cache_update += 1
-            if last_cache_update >= 48:
-                print("\n[CACHE] 24 soat o'tdi, user cache yangilanmoqda...")
-                asyncio.create_task(load_fast_users_cache())
-                last_cache_update = 0
+                # USER_CACHE_TTL_DAYS'dan eski userlar (faqat eskirgan savatlar ko'riladi)
+                expire_user_cache()
 
-        except Exception as e:
-            print(f"[X] Yangilash xatolik: {e}")
\ No newline at end of file
+                # Har 24 soatda (48 ta 30-daqiqalik interval)
+                last_cache_update += 1
+                if last_cache_update >= 48:
+                    print("\n[CACHE] 24 soat o'tdi, user cache yangilanmoqda...")
+                    asyncio.create_task(load_fast_users_cache())
+                    last_cache_update = 0
+
+            except Exception as e:
+                print(f"[X] Yangilash xatolik: {e}")
+    finally:
+        # Navbatda qolgan leadlarni yetkazishga urinish - jim yo'qolmasin
+        pending = delivery.pending()
+        if pending:
+            print(f"[INFO] To'xtatish: navbatda {pending} ta xabar, yetkazilmoqda...")
+        undelivered = await delivery.stop()
+        if undelivered:
+            print(f"[OGOHLANTIRISH] {undelivered} ta xabar yetkazilmadi (to'xtatish paytida navbatda qoldi)")
+
+        cache_writer.cancel()
+        await asyncio.gather(cache_writer, return_exceptions=True)
@@ -41,6 +41,78 @@ except:
 TEST_GROUP_LINK = os.getenv("TEST_GROUP_LINK", "https://t.me/+A3DpeN93ohg3ODgy")
 TEST_GROUP_ID = int(os.getenv("TEST_GROUP_ID", "-5002847429"))
 
+# ============================================================
+# KALIT SO'Z QIDIRUV (FUZZY)
+# ============================================================
+# Xato yozilgan so'zlarni ham topish ("kerek" -> "kerak"): 1 = yoqilgan
+FUZZY_MATCHING = os.getenv("FUZZY_MATCHING", "0") == "1"
+# Maksimal tahrir masofasi (1 yoki 2)
+FUZZY_MAX_DISTANCE = max(1, min(2, int(os.getenv("FUZZY_MAX_DISTANCE", "2"))))
+# Bundan qisqa kalit so'zlar faqat aniq qidiriladi
+FUZZY_MIN_LENGTH = int(os.getenv("FUZZY_MIN_LENGTH", "4"))
+
+# ============================================================
+# USERBOT PARALLEL SO'ROVLAR
+# ============================================================
+# rebuild_cache: bir vaqtda nechta guruh olinadi
+REBUILD_CONCURRENCY = int(os.getenv("REBUILD_CONCURRENCY", "5"))
+
+# ============================================================
+# XABAR YETKAZISH (DELIVERY QUEUE)
+# ============================================================
+# Bitta target chatga: daqiqasiga nechta xabar va bir martalik "burst"
+DELIVERY_CHAT_RATE_PER_MIN = float(os.getenv("DELIVERY_CHAT_RATE_PER_MIN", "20"))
+DELIVERY_CHAT_BURST = int(os.getenv("DELIVERY_CHAT_BURST", "5"))
+# Barcha chatlarga umumiy: soniyasiga nechta xabar
+DELIVERY_GLOBAL_RATE_PER_SEC = float(os.getenv("DELIVERY_GLOBAL_RATE_PER_SEC", "20"))
+DELIVERY_GLOBAL_BURST = int(os.getenv("DELIVERY_GLOBAL_BURST", "20"))
+# Bir vaqtda yuborilayotgan so'rovlar soni (target + buffer fan-out)
+DELIVERY_MAX_IN_FLIGHT = int(os.getenv("DELIVERY_MAX_IN_FLIGHT", "8"))
+
+# ============================================================
+# FAST GURUH A'ZOLARINI SINXRONLASH (PARTICIPANT SYNC)
+# ============================================================
+# Bir vaqtda nechta guruh o'qiladi
+PARTICIPANT_SYNC_CONCURRENCY = int(os.getenv("PARTICIPANT_SYNC_CONCURRENCY", "3"))
+# Umumiy RPC byudjeti: soniyasiga nechta GetParticipants so'rovi (barcha guruhlar)
+PARTICIPANT_SYNC_RPC_PER_SEC = float(os.getenv("PARTICIPANT_SYNC_RPC_PER_SEC", "2"))
+PARTICIPANT_SYNC_RPC_BURST = int(os.getenv("PARTICIPANT_SYNC_RPC_BURST", "3"))
+
+# ============================================================
+# USER CACHE
+# ============================================================
+# Fon writer necha soniyada bir faylga yozadi
+USER_CACHE_FLUSH_INTERVAL = int(os.getenv("USER_CACHE_FLUSH_INTERVAL", "60"))
+# Userlar necha kundan keyin cache'dan o'chiriladi (avtomatik tozalash)
+USER_CACHE_TTL_DAYS = int(os.getenv("USER_CACHE_TTL_DAYS", "30"))
+# Backend: json (sukut bo'yicha) yoki sqlite (katta cache'lar uchun, WAL)
+USER_CACHE_BACKEND = os.getenv("USER_CACHE_BACKEND", "json").lower()
+USER_CACHE_DB = os.getenv("USER_CACHE_DB", "data/user_cache.db")
+
+# ============================================================
+# BOT STATE
+# ============================================================
+# bot_state.json o'zgarganini (mtime) tekshirish oralig'i - soniya
+STATE_CHECK_INTERVAL = float(os.getenv("STATE_CHECK_INTERVAL", "2"))
+
+# ============================================================
+# DUPLICATE REMOVER
+# ============================================================
+# Deyarli bir xil xabarlarni ham o'chirish (SimHash)
+NEAR_DUPLICATE_ENABLED = os.getenv("NEAR_DUPLICATE_ENABLED", "0") == "1"
+# Nechta bit farq qilsa ham dublikat hisoblanadi (64 bitdan, 1-10)
+NEAR_DUPLICATE_THRESHOLD = min(max(int(os.getenv("NEAR_DUPLICATE_THRESHOLD", "3")), 1), 10)
+# Dublikatlar shu oyna (soniya) davomida yig'ilib, bitta so'rov bilan o'chiriladi
+DUPLICATE_DELETE_WINDOW = float(os.getenv("DUPLICATE_DELETE_WINDOW", "1.0"))
+# Dublikat qidiruv doirasi: "group" - har guruh alohida, "global" - barcha target guruhlar bitta indeksda
+DUPLICATE_SCOPE = os.getenv("DUPLICATE_SCOPE", "group").lower()
+if DUPLICATE_SCOPE not in ("group", "global"):
+    DUPLICATE_SCOPE = "group"
+# Global indeksdagi maksimal hashlar soni (oshsa eng kam ishlatilganlari tashlanadi)
+DUPLICATE_GLOBAL_MAX_HASHES = int(os.getenv("DUPLICATE_GLOBAL_MAX_HASHES", "500000"))
+# Har bir guruh jadvalidagi maksimal hashlar soni (xotira chegarasi, LRU)
+DUPLICATE_GROUP_CAPACITY = int(os.getenv("DUPLICATE_GROUP_CAPACITY", "100000"))
+
 # ============================================================
 # PATHS
 # ============================================================
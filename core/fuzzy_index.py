@@ -0,0 +1,147 @@
+"""
+Fuzzy Index - SymSpell uslubidagi o'chirishlar lug'ati
+
+Har bir bitta so'zli kalit so'z uchun 1-2 ta harfi o'chirilgan barcha
+variantlar oldindan hisoblanadi. Xabardagi so'z uchun ham xuddi shunday
+variantlar olinib, lug'atdan hash orqali qidiriladi - kalit so'zlar
+ro'yxatini aylanib chiqish kerak emas.
+
+Misol: "kerek", "kereek", "kirek" -> "kerak"
+"""
+
+
+def _deletes(word, distance):
+    """So'zdan `distance` tagacha harf o'chirilgan barcha variantlar (so'zning o'zi ham)"""
+    result = {word}
+    frontier = {word}
+    for _ in range(distance):
+        next_frontier = set()
+        for item in frontier:
+            if len(item) <= 1:
+                continue
+            for i in range(len(item)):
+                next_frontier.add(item[:i] + item[i + 1:])
+        result |= next_frontier
+        frontier = next_frontier
+    return result
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Damerau-Levenshtein (OSA) masofasi - yonma-yon harflar almashinuvi 1 ta xato
+
+    `max_distance` dan oshsa, max_distance + 1 qaytariladi (erta to'xtash).
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(prev[j] + 1, current[j - 1] + 1, prev[j - 1] + cost)
+            if (prev_prev is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, prev_prev[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+
+        if row_min > max_distance:
+            return max_distance + 1
+        prev_prev, prev = prev, current
+
+    return prev[-1]
+
+
+class DeletionIndex:
+    """
+    Bitta so'zli kalit so'zlar uchun o'chirishlar lug'ati
+
+    Qisqa so'zlar uchun ruxsat etilgan masofa kichikroq:
+    min_length uzunlikdagi so'z - 1 ta xato, undan uzunlari - max_distance gacha.
+    """
+
+    # Xabar so'zlari natijalari keshi (so'zlar xabarlarda ko'p takrorlanadi)
+    LOOKUP_CACHE_SIZE = 50000
+
+    def __init__(self, words, max_distance=2, min_length=4):
+        """
+        Args:
+            words: [(naqsh, ustuvorlik, asl_so'z), ...] - normallashtirilgan naqshlar
+            max_distance: Maksimal tahrir masofasi
+            min_length: Fuzzy qidiruv uchun minimal so'z uzunligi
+        """
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self._words = []
+        self._index = {}
+        self._lookup_cache = {}
+        self._min_len = None
+        self._max_len = 0
+
+        for pattern, priority, original in words:
+            if len(pattern) < min_length:
+                continue
+
+            allowed = min(max_distance, len(pattern) - min_length + 1)
+            word_id = len(self._words)
+            self._words.append((pattern, priority, original, allowed))
+
+            for variant in _deletes(pattern, allowed):
+                self._index.setdefault(variant, []).append(word_id)
+
+            self._min_len = len(pattern) if self._min_len is None else min(self._min_len, len(pattern))
+            self._max_len = max(self._max_len, len(pattern))
+
+    def __len__(self):
+        return len(self._words)
+
+    def lookup(self, token):
+        """
+        So'z uchun eng yaqin kalit so'zni topish
+
+        Nomzodlar avval tahrir masofasi, keyin ustuvorlik bo'yicha tanlanadi:
+        "kira" uchun "kire" (1 xato) "kerak" (2 xato) dan oldin keladi.
+
+        Returns:
+            (masofa, ustuvorlik, asl_so'z) yoki None
+        """
+        if not self._words:
+            return None
+
+        # Juda qisqa so'zlar ("ker", "bor") noto'g'ri moslik beradi
+        if (len(token) < max(self.min_length, self._min_len - self.max_distance)
+                or len(token) > self._max_len + self.max_distance):
+            return None
+
+        cache = self._lookup_cache
+        if token in cache:
+            return cache[token]
+
+        best = None
+        checked = set()
+        for variant in _deletes(token, self.max_distance):
+            for word_id in self._index.get(variant, ()):
+                if word_id in checked:
+                    continue
+                checked.add(word_id)
+
+                pattern, priority, original, allowed = self._words[word_id]
+                # Faqat joriy eng yaxshidan (masofa, ustuvorlik) yaxshiroq nomzod kerak
+                limit = allowed
+                if best is not None:
+                    limit = min(limit, best[0] if priority < best[1] else best[0] - 1)
+                    if limit < 0:
+                        continue
+
+                distance = edit_distance(token, pattern, limit)
+                if distance <= limit:
+                    best = (distance, priority, original)
+
+        if len(cache) >= self.LOOKUP_CACHE_SIZE:
+            cache.clear()
+        cache[token] = best
+        return best
@@ -0,0 +1,294 @@
+"""
+Keyword Matcher - Aho-Corasick avtomati asosida kalit so'zlarni qidirish
+
+Kalit so'zlar va qora ro'yxat so'zlari bitta avtomatga kompilyatsiya qilinadi
+va xabar matni bir marta (chiziqli) o'qib chiqiladi:
+- Ko'p so'zli so'zlar (masalan "odam bor") - matn ichida istalgan joyda
+- Bitta so'zli so'zlar (masalan "kire") - faqat butun so'z sifatida
+
+Bitta o'qishda ham birinchi kalit so'z, ham qora ro'yxat so'zi topiladi,
+shuning uchun uzun qora ro'yxat xabar uchun deyarli qo'shimcha vaqt olmaydi.
+
+Matn va so'zlar avval normallashtiriladi (kirill -> lotin, apostroflar),
+shuning uchun "кире" va "kire" bitta naqsh bo'lib qoladi.
+
+Fuzzy rejimda (FUZZY_MATCHING=1) aniq kalit so'z topilmasa, bitta so'zli
+kalit so'zlar o'chirishlar lug'ati orqali xatolar bilan ham qidiriladi.
+
+Avtomat faqat `keywords` yoki `blackwords` ro'yxati o'zgarganda qayta quriladi.
+Hot path'da (userbot) avtomat StateSnapshot.version bo'yicha olinadi - har
+xabarda ro'yxatlardan kalit yasalmaydi va hash hisoblanmaydi.
+"""
+import re
+from collections import deque, namedtuple
+
+from core.config import FUZZY_MATCHING, FUZZY_MAX_DISTANCE, FUZZY_MIN_LENGTH
+from core.fuzzy_index import DeletionIndex
+from core.text_normalize import normalize_text
+
+# So'z turlari (avtomat natijalarida)
+KIND_KEYWORD = 0
+KIND_BLACKWORD = 1
+
+# Baholash natijasi: keyword - birinchi kalit so'z, blackword - qora ro'yxat so'zi
+MatchResult = namedtuple("MatchResult", ["keyword", "blackword"])
+
+NO_MATCH = MatchResult(None, None)
+
+# Fuzzy qidiruv uchun so'zlar (apostrofli so'zlar bilan: "bo'sh")
+_TOKEN_RE = re.compile(r"\w+(?:'\w+)*")
+
+
+def _is_word_char(ch):
+    """`\\w` regex bilan bir xil: harf, raqam yoki pastki chiziq"""
+    return ch.isalnum() or ch == '_'
+
+
+class TextMatcher:
+    """
+    Kalit so'zlar + qora ro'yxat uchun kompilyatsiya qilingan avtomat
+
+    Kalit so'z ustuvorligi (avvalgi tekshiruv bilan bir xil):
+    avval ko'p so'zli kalit so'zlar (ro'yxat tartibida), keyin bitta so'zlilar.
+    Qora ro'yxat so'zlari esa ro'yxatdagi tartibda.
+
+    normalize=True bo'lsa, so'zlar kompilyatsiyada, matn esa baholashda
+    normallashtiriladi; natijada admin kiritgan (birinchi) so'z qaytariladi.
+
+    fuzzy_distance > 0 bo'lsa, bitta so'zli kalit so'zlar shu masofagacha
+    xatolar bilan ham topiladi (faqat aniq moslik bo'lmaganda).
+    """
+
+    def __init__(self, keywords, blackwords=(), normalize=True,
+                 fuzzy_distance=0, fuzzy_min_length=FUZZY_MIN_LENGTH):
+        self.keywords = tuple(keywords)
+        self.blackwords = tuple(blackwords)
+        self.normalize = normalize
+        self.fuzzy_distance = fuzzy_distance
+        self.fuzzy_min_length = fuzzy_min_length
+        self.pattern_count = 0
+        self._fuzzy = None
+
+        # Trie: har bir tugun - {belgi: keyingi_tugun}
+        self._goto = [{}]
+        self._fail = [0]
+        # Tugundan chiqadigan natijalar: [(tur, ustuvorlik, uzunlik, butun_so'z, asl_so'z), ...]
+        self._output = [[]]
+
+        self._build()
+
+    def _prepare(self, text):
+        return normalize_text(text) if self.normalize else text.lower()
+
+    def _unique_patterns(self, words):
+        """So'zlarni normallashtirish va takrorlarini olib tashlash: [(naqsh, asl_so'z), ...]"""
+        seen = set()
+        result = []
+        for word in words:
+            pattern = self._prepare(word).strip() if word else ""
+            if pattern and pattern not in seen:
+                seen.add(pattern)
+                result.append((pattern, word))
+        return result
+
+    def _add_pattern(self, pattern, kind, priority, whole_word, original):
+        self.pattern_count += 1
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = nxt
+        self._output[node].append((kind, priority, len(pattern), whole_word, original))
+
+    def _build(self):
+        keywords = self._unique_patterns(self.keywords)
+        multi = [item for item in keywords if ' ' in item[0]]
+        single = [item for item in keywords if ' ' not in item[0]]
+
+        # Kalit so'zlar: ko'p so'zlilar birinchi, keyin bitta so'zlilar
+        for priority, (pattern, kw) in enumerate(multi):
+            self._add_pattern(pattern, KIND_KEYWORD, priority, False, kw)
+        for priority, (pattern, kw) in enumerate(single, start=len(multi)):
+            self._add_pattern(pattern, KIND_KEYWORD, priority, True, kw)
+
+        # Fuzzy: bitta so'zli kalit so'zlar uchun o'chirishlar lug'ati
+        if self.fuzzy_distance > 0:
+            self._fuzzy = DeletionIndex(
+                [(pattern, priority, kw)
+                 for priority, (pattern, kw) in enumerate(single, start=len(multi))],
+                max_distance=self.fuzzy_distance,
+                min_length=self.fuzzy_min_length,
+            )
+
+        # Qora ro'yxat: ro'yxat tartibida
+        for priority, (pattern, bw) in enumerate(self._unique_patterns(self.blackwords)):
+            self._add_pattern(pattern, KIND_BLACKWORD, priority, ' ' not in pattern, bw)
+
+        # Fail havolalarini BFS bilan qurish
+        queue = deque()
+        for nxt in self._goto[0].values():
+            self._fail[nxt] = 0
+            queue.append(nxt)
+
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+
+                # Fail tugunining natijalarini meros qilib olish
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+
+        # Natijalarni (tur, ustuvorlik) bo'yicha saralash
+        for outputs in self._output:
+            outputs.sort()
+
+    def evaluate(self, text):
+        """
+        Matnni bir marta o'qib, kalit so'z va qora ro'yxat so'zini topish
+
+        Args:
+            text: Xabar matni (asl ko'rinishda)
+
+        Returns:
+            MatchResult(keyword, blackword)
+        """
+        if not text or not self.pattern_count:
+            return NO_MATCH
+
+        text = self._prepare(text)
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        text_len = len(text)
+
+        # Har bir tur uchun eng yaxshi natija: [ustuvorlik, so'z]
+        best = [None, None]
+
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+
+            for kind, priority, length, whole_word, word in output[node]:
+                current = best[kind]
+                if current is not None and priority >= current[0]:
+                    continue
+
+                if whole_word:
+                    start = i - length + 1
+                    if start > 0 and _is_word_char(text[start - 1]):
+                        continue
+                    if i + 1 < text_len and _is_word_char(text[i + 1]):
+                        continue
+
+                best[kind] = (priority, word)
+
+        # Aniq kalit so'z topilmasa - xatolar bilan qidirish
+        if best[KIND_KEYWORD] is None and self._fuzzy:
+            best[KIND_KEYWORD] = self._fuzzy_find(text)
+
+        keyword = best[KIND_KEYWORD][1] if best[KIND_KEYWORD] else None
+        blackword = best[KIND_BLACKWORD][1] if best[KIND_BLACKWORD] else None
+        return MatchResult(keyword, blackword)
+
+    def _fuzzy_find(self, text):
+        """
+        Matn so'zlarini o'chirishlar lug'atidan qidirish: (ustuvorlik, so'z) yoki None
+
+        Eng kam xatoli moslik tanlanadi, teng bo'lsa - ustuvorroq kalit so'z.
+        """
+        best = None
+        for token in set(_TOKEN_RE.findall(text)):
+            found = self._fuzzy.lookup(token)
+            if found is not None and (best is None or found[:2] < best[:2]):
+                best = found
+        return (best[1], best[2]) if best is not None else None
+
+
+# Kompilyatsiya qilingan avtomatlar: {(keywords, blackwords): TextMatcher}
+# Ro'yxatlar o'zgarmaguncha qayta ishlatiladi
+_matcher_cache = {}
+_MATCHER_CACHE_SIZE = 4
+
+
+def get_text_matcher(keywords, blackwords=()):
+    """
+    Keywords va blackwords uchun kompilyatsiya qilingan avtomatni olish
+
+    Avtomat faqat ro'yxatlardan biri o'zgarganda qayta quriladi.
+    Fuzzy rejim core.config dagi FUZZY_* sozlamalaridan olinadi.
+    """
+    key = (tuple(keywords), tuple(blackwords))
+
+    matcher = _matcher_cache.get(key)
+    if matcher is None:
+        if len(_matcher_cache) >= _MATCHER_CACHE_SIZE:
+            # Eng eski avtomatni chiqarib tashlash
+            _matcher_cache.pop(next(iter(_matcher_cache)))
+
+        matcher = TextMatcher(
+            *key,
+            fuzzy_distance=FUZZY_MAX_DISTANCE if FUZZY_MATCHING else 0,
+        )
+        _matcher_cache[key] = matcher
+        print(f"[MATCHER] Avtomat qayta qurildi: {len(key[0])} ta kalit so'z, "
+              f"{len(key[1])} ta qora ro'yxat so'z ({matcher.pattern_count} ta naqsh)")
+
+    return matcher
+
+
+# Oxirgi snapshot avtomati: (snapshot versiyasi, TextMatcher)
+_snapshot_matcher = (None, None)
+
+
+def get_snapshot_matcher(snapshot):
+    """
+    StateSnapshot uchun avtomat - O(1), faqat versiya o'zgarganda qidiriladi
+
+    Args:
+        snapshot: core.storage.StateSnapshot
+    """
+    global _snapshot_matcher
+    version, matcher = _snapshot_matcher
+    if version != snapshot.version:
+        matcher = get_text_matcher(snapshot.keywords, snapshot.blackwords)
+        _snapshot_matcher = (snapshot.version, matcher)
+    return matcher
+
+
+def evaluate_snapshot(text, snapshot):
+    """
+    Xabarni snapshot'dagi keywords/blackwords bo'yicha baholash (hot path)
+
+    Returns:
+        MatchResult(keyword, blackword) - topilmasa maydonlar None
+    """
+    if not text:
+        return NO_MATCH
+
+    return get_snapshot_matcher(snapshot).evaluate(text)
+
+
+def evaluate_message(text, keywords, blackwords=()):
+    """
+    Xabarni bir o'qishda baholash
+
+    Returns:
+        MatchResult(keyword, blackword) - topilmasa maydonlar None
+    """
+    if not text:
+        return NO_MATCH
+
+    return get_text_matcher(keywords, blackwords).evaluate(text)
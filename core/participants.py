@@ -0,0 +1,136 @@
+"""
+Participants - guruh a'zolarini olish uchun umumiy kutubxona
+
+iter_participant_pages - GetParticipants sahifalarini beruvchi async generator.
+Barcha joylar (userbot sync, scriptlar, auto_kick) shu bitta sikldan foydalanadi:
+- FloodWait (call_with_flood_wait) va ixtiyoriy umumiy RPC byudjeti (TokenBucket)
+- Davom ettirish: `offset` dan boshlanadi, har sahifada `next_offset` qaytadi
+- Delta: sahifa hash'lari yuborilsa, o'zgarmagan sahifalar qayta yuklanmaydi
+- Oxirgi bo'sh javob ham beriladi (users bo'sh) - undagi `total` (result.count)
+  barcha sahifalar o'zgarmagan bo'lsa ham a'zolar sonini bilish imkonini beradi
+
+GetParticipants "hash" parametri: oldingi javobdagi ID'lar hash'i yuborilsa,
+sahifa o'zgarmagan bo'lsa Telegram ChannelParticipantsNotModified qaytaradi.
+"""
+import time
+from typing import NamedTuple
+
+from telethon.tl.functions.channels import GetParticipantsRequest
+from telethon.tl.types import ChannelParticipantsSearch
+from telethon.tl.types.channels import ChannelParticipantsNotModified
+
+from core.rate_limit import call_with_flood_wait
+
+# Telegram bitta so'rovda maksimal 200 ta a'zo beradi
+PAGE_SIZE = 200
+
+_MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+
+class ParticipantPage(NamedTuple):
+    """GetParticipants sahifasi"""
+    offset: int           # Sahifa boshlanishi
+    next_offset: int      # Keyingi sahifa (checkpoint uchun)
+    users: list           # telethon User'lar (not_modified bo'lsa bo'sh)
+    participants: list    # ChannelParticipant* obyektlar
+    total: int            # Server aytgan jami a'zolar soni (not_modified bo'lsa 0)
+    not_modified: bool    # Sahifa o'zgarmagan (hash mos keldi)
+
+
+def participants_hash(ids):
+    """
+    Telegram hash algoritmi (ID'lar ro'yxati bo'yicha, javobdagi tartibda)
+
+    Returns:
+        64-bitli ishorali (signed) butun son
+    """
+    h = 0
+    for value in ids:
+        h ^= h >> 21
+        h ^= (h << 35) & _MASK_64
+        h ^= h >> 4
+        h = (h + value) & _MASK_64
+
+    return h - (1 << 64) if h >= (1 << 63) else h
+
+
+def participant_user_id(participant):
+    """ChannelParticipant* obyektidan user ID (Banned/Left'da peer ichida)"""
+    user_id = getattr(participant, 'user_id', None)
+    if user_id is None:
+        peer = getattr(participant, 'peer', None)
+        user_id = getattr(peer, 'user_id', None)
+    return user_id
+
+
+def page_hash(participants):
+    """GetParticipants javobi (channels.ChannelParticipants) sahifasining hash'i"""
+    ids = [participant_user_id(p) for p in participants.participants]
+    return participants_hash(user_id for user_id in ids if user_id is not None)
+
+
+async def iter_participant_pages(client, entity, query='', offset=0, limit=None,
+                                 page_size=PAGE_SIZE, budget=None,
+                                 page_hashes=None, hash_max_age=None):
+    """
+    Guruh a'zolarini sahifalab olish
+
+    Args:
+        client: TelegramClient
+        entity: Guruh entity'si
+        query: Qidiruv so'zi ('' - hammasi)
+        offset: Boshlang'ich offset (davom ettirish uchun)
+        limit: Maksimal a'zolar soni (None - hammasi)
+        page_size: Bitta so'rovdagi a'zolar soni
+        budget: Umumiy TokenBucket (parallel chaqiruvlar uchun), ixtiyoriy
+        page_hashes: {str(offset): [hash, soni, vaqt]} - berilsa, hash'lar
+            yuboriladi va yangilanadi (faqat delta kerak bo'lgan joylar uchun)
+        hash_max_age: Bundan eski hash yuborilmaydi (soniya)
+
+    Yields:
+        ParticipantPage. Oxirida bo'sh javob ham beriladi (count=0):
+        users bo'sh, next_offset == offset, total - server aytgan a'zolar soni.
+
+    Xatoliklar (FloodWait'dan tashqari) chaqiruvchiga uzatiladi.
+    """
+    fetched = 0
+    while limit is None or fetched < limit:
+        request_limit = page_size if limit is None else min(page_size, limit - fetched)
+
+        known = page_hashes.get(str(offset)) if page_hashes is not None else None
+        if known and hash_max_age is not None and time.time() - known[2] > hash_max_age:
+            known = None
+
+        if budget is not None:
+            await budget.acquire()
+
+        result = await call_with_flood_wait(client, GetParticipantsRequest(
+            channel=entity,
+            filter=ChannelParticipantsSearch(query),
+            offset=offset,
+            limit=request_limit,
+            hash=known[0] if known else 0
+        ))
+
+        if isinstance(result, ChannelParticipantsNotModified):
+            count = known[1]
+            page = ParticipantPage(offset, offset + count, [], [], 0, True)
+        else:
+            count = len(result.participants)
+            if page_hashes is not None:
+                if count:
+                    page_hashes[str(offset)] = [page_hash(result), count, int(time.time())]
+                else:
+                    page_hashes.pop(str(offset), None)
+            page = ParticipantPage(offset, offset + count, result.users, result.participants,
+                                   result.count, False)
+
+        yield page
+
+        if not count:
+            return
+
+        fetched += count
+        offset += count
+        if count < request_limit:
+            return
@@ -0,0 +1,111 @@
+"""
+Rate Limit - Telegram FloodWait bilan ishlash
+
+FloodWait xatoligida server aytgan `seconds` qadar kutib, so'rov qayta
+yuboriladi. Kutish vaqtida boshqa parallel so'rovlar ham to'xtab turadi,
+shuning uchun hisob (account) yana flood'ga tushmaydi.
+"""
+import asyncio
+import time
+
+try:
+    from telethon.errors import FloodWaitError
+except ImportError:
+    FloodWaitError = None
+
+try:
+    from aiogram.exceptions import TelegramRetryAfter
+except ImportError:
+    TelegramRetryAfter = None
+
+
+# Bundan uzoq FloodWait bo'lsa, kutmasdan xatolik qaytariladi
+FLOOD_WAIT_MAX_SECONDS = 300
+
+# Umumiy "flood darvozasi": shu vaqtgacha (monotonic) yangi so'rov yuborilmaydi
+_flood_resume_at = 0.0
+
+
+def get_flood_wait_seconds(error):
+    """
+    Xatolik FloodWait bo'lsa, kutish soniyalarini qaytarish
+
+    Returns:
+        Soniyalar (int) yoki None (FloodWait emas)
+    """
+    if FloodWaitError is not None and isinstance(error, FloodWaitError):
+        return error.seconds
+    if TelegramRetryAfter is not None and isinstance(error, TelegramRetryAfter):
+        return error.retry_after
+    return None
+
+
+def hold_flood_gate(seconds):
+    """Barcha so'rovlarni `seconds` soniyaga to'xtatib turish"""
+    global _flood_resume_at
+    _flood_resume_at = max(_flood_resume_at, time.monotonic() + seconds)
+
+
+async def wait_flood_gate():
+    """Flood darvozasi ochilguncha kutish"""
+    delay = _flood_resume_at - time.monotonic()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+async def call_with_flood_wait(func, *args, retries=3, max_wait=FLOOD_WAIT_MAX_SECONDS, **kwargs):
+    """
+    Async funksiyani FloodWait'ni hisobga olgan holda chaqirish
+
+    Args:
+        func: Async funksiya (masalan client.get_entity)
+        retries: FloodWait'dan keyin necha marta qayta urinish
+        max_wait: Bundan uzoq FloodWait bo'lsa, xatolik qaytariladi
+
+    Returns:
+        func natijasi
+    """
+    attempt = 0
+    while True:
+        await wait_flood_gate()
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            seconds = get_flood_wait_seconds(e)
+            if seconds is None or attempt >= retries or seconds > max_wait:
+                raise
+
+            attempt += 1
+            print(f"[FLOOD] FloodWait {seconds}s - kutilmoqda ({attempt}/{retries})...")
+            hold_flood_gate(seconds + 1)
+
+
+class TokenBucket:
+    """
+    Token bucket - so'rovlar tezligini cheklash
+
+    Har soniyada `rate` ta token qo'shiladi, maksimal `capacity` ta yig'iladi.
+    Har bir so'rov bitta token oladi; token bo'lmasa, paydo bo'lguncha kutiladi.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Bitta token olish (kerak bo'lsa kutib)"""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
@@ -1,7 +1,12 @@
 import json
+import time
 from pathlib import Path
+from typing import NamedTuple
 import os
 
+from core.config import STATE_CHECK_INTERVAL
+from core.text_normalize import normalize_text
+
 # Get project root directory
 PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
@@ -37,6 +42,88 @@ def save_state(state):
     with open(STATE_FILE, 'w', encoding='utf-8') as f:
         json.dump(state, f, ensure_ascii=False, indent=2)
 
+    # Xotiradagi snapshot'ni darhol yangilash (admin bot yozganda)
+    _set_snapshot(state, _get_state_mtime())
+
+
+# ============================================================
+# STATE SNAPSHOT - har xabarda diskdan o'qimaslik uchun
+# ============================================================
+
+class StateSnapshot(NamedTuple):
+    """
+    State'dan tayyor hisoblangan o'zgarmas (immutable) ko'rinishlar
+
+    Faqat tuple/frozenset/str maydonlar - snapshot'ni joyida o'zgartirib
+    bo'lmaydi, yangi versiya faqat _set_snapshot orqali yaratiladi.
+    """
+    version: int
+    mtime: float
+    keywords: tuple          # kichik harfli, bo'shlarsiz kalit so'zlar
+    blackwords: tuple        # kichik harfli qora ro'yxat (tartib saqlangan)
+    target_groups: tuple     # yuborish uchun: int ID yoki username
+    target_ids: frozenset    # faqat int ID'lar (tez tekshirish uchun)
+    buffer_group: str
+
+
+_snapshot = None
+_snapshot_checked_at = 0.0
+
+
+def _get_state_mtime():
+    try:
+        return os.stat(STATE_FILE).st_mtime
+    except OSError:
+        return 0.0
+
+
+def _parse_chat_id(value):
+    """'-100123' -> -100123, username esa o'zgarishsiz qoladi"""
+    if isinstance(value, int):
+        return value
+    value = str(value).strip()
+    return int(value) if value.lstrip('-').isdigit() else value
+
+
+def _set_snapshot(state, mtime):
+    global _snapshot
+
+    keywords = tuple(kw.lower().strip() for kw in state.get("keywords", []) if kw.strip())
+    blackwords = tuple(bw.lower().strip() for bw in state.get("blackwords", []) if bw.strip())
+    target_groups = tuple(_parse_chat_id(t) for t in state.get("target_groups", []))
+
+    _snapshot = StateSnapshot(
+        version=(_snapshot.version + 1) if _snapshot else 1,
+        mtime=mtime,
+        keywords=keywords,
+        blackwords=blackwords,
+        target_groups=target_groups,
+        target_ids=frozenset(t for t in target_groups if isinstance(t, int)),
+        buffer_group=state.get("buffer_group", "") or "",
+    )
+    return _snapshot
+
+
+def get_state_snapshot():
+    """
+    Joriy state snapshot'ini olish - xabar handlerlari uchun
+
+    Diskdan faqat fayl o'zgarganda (mtime) o'qiladi, mtime esa
+    STATE_CHECK_INTERVAL soniyada bir martadan ko'p tekshirilmaydi.
+    """
+    global _snapshot_checked_at
+
+    now = time.monotonic()
+    if _snapshot is not None and now - _snapshot_checked_at < STATE_CHECK_INTERVAL:
+        return _snapshot
+
+    _snapshot_checked_at = now
+    mtime = _get_state_mtime()
+    if _snapshot is None or mtime != _snapshot.mtime:
+        return _set_snapshot(load_state(), mtime)
+
+    return _snapshot
+
 def get_items(key):
     state = load_state()
     items = state.get(key, [])
@@ -71,6 +158,12 @@ def add_item(key, value, item_type=None):
             "id": value,
             "type": item_type or "normal"
         })
+    elif key in ("keywords", "blackwords"):
+        # Kirill/lotin va apostrof variantlari bitta so'z hisoblanadi
+        normalized = normalize_text(value).strip()
+        if any(normalize_text(item).strip() == normalized for item in items):
+            return False
+        items.append(value)
     else:
         # Oddiy qo'shish
         if value in items:
@@ -0,0 +1,48 @@
+"""
+Text Normalize - o'zbek matnini yagona ko'rinishga keltirish
+
+- Kirill yozuvi lotinga o'giriladi ("кире" -> "kire", "керак" -> "kerak")
+- Apostrof variantlari (ʻ ʼ ‘ ’ ` ´) oddiy ' ga keltiriladi ("boʻsh" -> "bo'sh")
+
+Tarjima jadvali oldindan tayyorlanadi va `str.translate` bilan bir o'tishda
+qo'llaniladi. Kalit so'zlar ham kompilyatsiya paytida xuddi shunday
+normallashtiriladi, shuning uchun bitta kalit so'z ikkala yozuvni qamraydi.
+"""
+
+APOSTROPHE = "'"
+
+# Apostrof o'rnida ishlatiladigan belgilar
+_APOSTROPHE_VARIANTS = "ʻʼ‘’`´′ʹ"
+
+# O'zbek kirill -> lotin (kichik harflar, matn avval lower() qilinadi)
+_CYRILLIC_TO_LATIN = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d",
+    "е": "e", "ё": "yo", "ж": "j", "з": "z", "и": "i",
+    "й": "y", "к": "k", "л": "l", "м": "m", "н": "n",
+    "о": "o", "п": "p", "р": "r", "с": "s", "т": "t",
+    "у": "u", "ф": "f", "х": "x", "ц": "ts", "ч": "ch",
+    "ш": "sh", "щ": "sh", "ъ": APOSTROPHE, "ы": "i", "ь": "",
+    "э": "e", "ю": "yu", "я": "ya",
+    "ў": "o" + APOSTROPHE, "қ": "q", "ғ": "g" + APOSTROPHE, "ҳ": "h",
+}
+
+NORMALIZE_TABLE = str.maketrans({
+    **_CYRILLIC_TO_LATIN,
+    **{ch: APOSTROPHE for ch in _APOSTROPHE_VARIANTS},
+})
+
+
+def normalize_text(text):
+    """
+    Matnni normallashtirish: kichik harf + kirill->lotin + apostrof
+
+    Args:
+        text: Xabar matni yoki kalit so'z
+
+    Returns:
+        Normallashtirilgan matn
+    """
+    if not text:
+        return ""
+
+    return text.lower().translate(NORMALIZE_TABLE)
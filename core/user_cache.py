@@ -1,17 +1,145 @@
 """
 User Cache - FAST guruhlar uchun user ma'lumotlarini saqlash
 Xabar o'chirilgandan keyin ham user ma'lumotlarini topish imkonini beradi
+
+Cache xotirada ixcham UserRecord yozuvlari sifatida turadi
+(har chaqiruvda JSON o'qilmaydi/yozilmaydi).
+O'zgarishlar "dirty" deb belgilanadi va fon writer tomonidan davriy
+hamda dastur to'xtaganda faylga yoziladi (write-behind).
+
+Bitta yozuvchi qoidasi: faylga asosan bitta jarayon (userbot) yozadi - u
+fayldan faqat bir marta o'qiydi va keyin butun faylni xotiradan qayta yozadi.
+Boshqa jarayon faylni o'zgartirgan bo'lsa (mtime yuklangandan beri boshqa),
+yozishdan oldin fayldagi yangiroq yozuvlar xotiraga qo'shiladi. Bir vaqtning
+o'zida ikki jarayon yozishi (race) baribir bittasining o'zgarishini yo'qotishi
+mumkin - userbot ishlayotganda alohida scriptlar SQLite backend'dan foydalansin.
 """
+import asyncio
+import atexit
+import heapq
 import json
 import os
+import sys
+import time
 from datetime import datetime
 
+from core.config import USER_CACHE_FLUSH_INTERVAL, USER_CACHE_TTL_DAYS, USER_CACHE_BACKEND
+
 
 USER_CACHE_FILE = "data/user_cache.json"
 
+# Hisoblagichlar (stats) - alohida scriptlar butun cache'ni o'qimasligi uchun
+USER_CACHE_STATS_FILE = "data/user_cache_stats.json"
+
+# Fon writer ishlayotgan jarayon PID'i - alohida scriptlar JSON cache'ni
+# userbot bilan bir vaqtda yozmasligi uchun
+USER_CACHE_LOCK_FILE = "data/user_cache.lock"
+
+# Muddat savatlari (bucket) kengligi, soniya - tozalash shu aniqlikda ishlaydi
+EXPIRY_BUCKET_SECONDS = 3600
+
+# UserRecord.flags bitlari
+FLAG_VERIFIED = 1
+FLAG_PREMIUM = 2
+
+
+class UserRecord:
+    """
+    Ixcham user yozuvi - yuz minglab userlar uchun xotira tejamkor
+
+    - __slots__: har bir yozuvda dict yo'q
+    - Ismlar intern qilinadi (bir xil ismlar bitta obyektni ulashadi)
+    - cached_at - butun son (epoch soniya), ISO string emas
+    - full_name saqlanmaydi, kerak bo'lganda hisoblanadi
+    """
+    __slots__ = ('id', 'first_name', 'last_name', 'username', 'phone', 'flags', 'cached_at')
+
+    def __init__(self, user_id, first_name, last_name, username, phone, flags, cached_at):
+        self.id = user_id
+        self.first_name = sys.intern(first_name) if first_name else ''
+        self.last_name = sys.intern(last_name) if last_name else ''
+        self.username = username or None
+        self.phone = phone or None
+        self.flags = flags
+        self.cached_at = cached_at
+
+    @classmethod
+    def from_dict(cls, user_id, user_data, cached_at):
+        flags = 0
+        if user_data.get('is_verified'):
+            flags |= FLAG_VERIFIED
+        if user_data.get('is_premium'):
+            flags |= FLAG_PREMIUM
+        return cls(
+            int(user_id),
+            user_data.get('first_name'),
+            user_data.get('last_name'),
+            user_data.get('username'),
+            user_data.get('phone'),
+            flags,
+            cached_at,
+        )
+
+    @property
+    def full_name(self):
+        return f"{self.first_name} {self.last_name}".strip() or 'Noma\'lum'
+
+    def to_dict(self):
+        """Eski API formati (get_user_from_cache natijasi)"""
+        return {
+            'id': self.id,
+            'first_name': self.first_name,
+            'last_name': self.last_name,
+            'full_name': self.full_name,
+            'username': self.username,
+            'phone': self.phone,
+            'is_verified': bool(self.flags & FLAG_VERIFIED),
+            'is_premium': bool(self.flags & FLAG_PREMIUM),
+            'cached_at': datetime.fromtimestamp(self.cached_at).isoformat(),
+        }
+
+    def to_json(self):
+        """Faylga yozish formati (full_name'siz, cached_at - epoch)"""
+        return {
+            'first_name': self.first_name,
+            'last_name': self.last_name,
+            'username': self.username,
+            'phone': self.phone,
+            'is_verified': bool(self.flags & FLAG_VERIFIED),
+            'is_premium': bool(self.flags & FLAG_PREMIUM),
+            'cached_at': self.cached_at,
+        }
+
+
+def _parse_cached_at(value):
+    """cached_at: epoch (yangi format) yoki ISO string (eski format) -> epoch"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except (TypeError, ValueError):
+        return int(time.time())
+
+
+# Xotiradagi cache: {user_id (int): UserRecord}
+_cache = None
+_dirty = False
+
+# Fayl mtime'i (yuklangan yoki oxirgi yozilgan paytda) - boshqa jarayon
+# faylni o'zgartirganini aniqlash uchun
+_file_mtime = None
+
+# Muddat savatlari: {bucket: set(user_id)} - bucket = cached_at // EXPIRY_BUCKET_SECONDS
+# _bucket_heap - mavjud savatlar (eng eskisi tepada), tozalash faqat eskilarini ko'radi
+_expiry_buckets = {}
+_bucket_heap = []
+
+# Hisoblagichlar - qo'shish/yangilash/o'chirishda yangilanadi (get_cache_stats O(1))
+_stats = {'total': 0, 'with_username': 0, 'with_phone': 0}
+
 
 def load_user_cache():
-    """User cache'ni yuklash"""
+    """User cache'ni fayldan yuklash (xom dict ko'rinishida)"""
     if not os.path.exists(USER_CACHE_FILE):
         return {}
 
@@ -24,15 +152,91 @@ def load_user_cache():
 
 
 def save_user_cache(cache):
-    """User cache'ni saqlash"""
+    """
+    User cache'ni saqlash (vaqtinchalik faylga yozib, keyin almashtirish)
+
+    Args:
+        cache: {user_id: UserRecord yoki dict}
+    """
     try:
+        data = {
+            str(user_id): record.to_json() if isinstance(record, UserRecord) else record
+            for user_id, record in cache.items()
+        }
         os.makedirs(os.path.dirname(USER_CACHE_FILE), exist_ok=True)
-        with open(USER_CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(cache, f, ensure_ascii=False, indent=2)
+        tmp_file = USER_CACHE_FILE + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_file, USER_CACHE_FILE)
     except Exception as e:
         print(f"[OGOHLANTIRISH] User cache saqlanmadi: {e}")
 
 
+def _cache_file_mtime():
+    try:
+        return os.stat(USER_CACHE_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _iter_file_records():
+    """Fayldagi yozuvlar -> UserRecord (buzuq yozuvlar o'tkazib yuboriladi)"""
+    for user_id, user_data in load_user_cache().items():
+        try:
+            yield UserRecord.from_dict(
+                user_id, user_data, _parse_cached_at(user_data.get('cached_at'))
+            )
+        except (TypeError, ValueError, AttributeError):
+            continue
+
+
+def _get_cache():
+    """Xotiradagi cache (birinchi chaqiruvda fayldan yuklanadi)"""
+    global _cache, _file_mtime
+    if _cache is None:
+        _cache = {}
+        # mtime o'qishdan oldin olinadi - o'qish paytidagi o'zgarish keyingi yozishda birlashtiriladi
+        _file_mtime = _cache_file_mtime()
+        for record in _iter_file_records():
+            _put_record(_cache, record)
+    return _cache
+
+
+def _count(record, sign, stats=_stats):
+    """Hisoblagichlarga yozuvni qo'shish (sign=1) yoki ayirish (sign=-1)"""
+    stats['total'] += sign
+    if record.username:
+        stats['with_username'] += sign
+    if record.phone:
+        stats['with_phone'] += sign
+
+
+def _put_record(cache, record):
+    """Yozuvni cache'ga qo'yish, hisoblagichlar va muddat savatini yangilash"""
+    old = cache.get(record.id)
+    if old is not None:
+        _count(old, -1)
+        old_bucket = old.cached_at // EXPIRY_BUCKET_SECONDS
+        members = _expiry_buckets.get(old_bucket)
+        if members is not None:
+            members.discard(record.id)
+
+    cache[record.id] = record
+    _count(record, 1)
+
+    bucket = record.cached_at // EXPIRY_BUCKET_SECONDS
+    members = _expiry_buckets.get(bucket)
+    if members is None:
+        members = _expiry_buckets[bucket] = set()
+        heapq.heappush(_bucket_heap, bucket)
+    members.add(record.id)
+
+
+def _mark_dirty():
+    global _dirty
+    _dirty = True
+
+
 def add_user_to_cache(user_id, user_data):
     """
     Bitta userni cache'ga qo'shish
@@ -41,37 +245,31 @@ def add_user_to_cache(user_id, user_data):
         user_id: User ID (int yoki str)
         user_data: User ma'lumotlari (dict)
     """
-    cache = load_user_cache()
+    cache = _get_cache()
 
-    user_id_str = str(user_id)
+    # Yangi yozuv (mavjudini o'zgartirmasdan almashtirish - writer thread uchun xavfsiz)
+    _put_record(cache, UserRecord.from_dict(user_id, user_data, int(time.time())))
 
-    # Yangi ma'lumotlarni qo'shish
-    cache[user_id_str] = {
-        **user_data,
-        "cached_at": datetime.now().isoformat()
-    }
-
-    save_user_cache(cache)
+    _mark_dirty()
 
 
-def add_users_bulk(users_dict):
+def add_users_bulk(users_dict, verbose=True):
     """
     Ko'p userlarni bir vaqtda qo'shish
 
     Args:
         users_dict: {user_id: user_data, ...}
+        verbose: Natijani chop etish (sahifalab yozishda o'chiriladi)
     """
-    cache = load_user_cache()
+    cache = _get_cache()
+    cached_at = int(time.time())
 
     for user_id, user_data in users_dict.items():
-        user_id_str = str(user_id)
-        cache[user_id_str] = {
-            **user_data,
-            "cached_at": datetime.now().isoformat()
-        }
+        _put_record(cache, UserRecord.from_dict(user_id, user_data, cached_at))
 
-    save_user_cache(cache)
-    print(f"[OK] {len(users_dict)} ta user cache'ga qo'shildi")
+    _mark_dirty()
+    if verbose:
+        print(f"[OK] {len(users_dict)} ta user cache'ga qo'shildi")
 
 
 def get_user_from_cache(user_id):
@@ -84,10 +282,12 @@ def get_user_from_cache(user_id):
     Returns:
         User ma'lumotlari (dict) yoki None
     """
-    cache = load_user_cache()
-    user_id_str = str(user_id)
+    try:
+        record = _get_cache().get(int(user_id))
+    except (TypeError, ValueError):
+        return None
 
-    return cache.get(user_id_str)
+    return record.to_dict() if record else None
 
 
 def get_user_display_info(user_id):
@@ -125,52 +325,240 @@ def get_user_display_info(user_id):
 
 
 def get_cache_stats():
-    """Cache statistikasi"""
-    cache = load_user_cache()
+    """
+    Cache statistikasi - O(1)
 
-    total = len(cache)
-    with_username = sum(1 for u in cache.values() if u.get('username'))
-    with_phone = sum(1 for u in cache.values() if u.get('phone'))
+    Cache shu jarayonda yuklangan bo'lsa, xotiradagi hisoblagichlar qaytariladi.
+    main.py barcha botlarni bitta jarayonda ishga tushiradi, shuning uchun admin
+    bot ham userbot yuklagan hisoblagichlarni o'qiydi. Cache yuklanmagan bo'lsa
+    (alohida scriptlar yoki userbot cache'ni hali yuklamagan), writer yozgan
+    kichik stats fayli o'qiladi.
+    """
+    if _cache is not None:
+        return dict(_stats)
+
+    if os.path.exists(USER_CACHE_STATS_FILE):
+        try:
+            with open(USER_CACHE_STATS_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"[OGOHLANTIRISH] User cache stats o'qilmadi: {e}")
 
+    # Stats fayli hali yo'q (eski cache) - bir martalik hisoblash, cache xotirada qolmaydi
+    cache = load_user_cache()
     return {
-        'total': total,
-        'with_username': with_username,
-        'with_phone': with_phone
+        'total': len(cache),
+        'with_username': sum(1 for u in cache.values() if u.get('username')),
+        'with_phone': sum(1 for u in cache.values() if u.get('phone'))
     }
 
 
-def clear_old_cache(days=30):
+def save_cache_stats(stats):
+    """Hisoblagichlarni stats fayliga yozish"""
+    try:
+        os.makedirs(os.path.dirname(USER_CACHE_STATS_FILE), exist_ok=True)
+        tmp_file = USER_CACHE_STATS_FILE + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(stats, f)
+        os.replace(tmp_file, USER_CACHE_STATS_FILE)
+    except Exception as e:
+        print(f"[OGOHLANTIRISH] User cache stats saqlanmadi: {e}")
+
+
+def _expire_before(cutoff):
+    """
+    cutoff'dan eski savatlardagi userlarni o'chirish
+
+    Faqat muddati o'tgan savatlar ko'riladi (butun cache aylanib chiqilmaydi).
+    Chegaradagi savat keyingi tozalashda o'chiriladi (aniqlik - EXPIRY_BUCKET_SECONDS).
+
+    Returns:
+        O'chirilgan userlar soni
+    """
+    cache = _get_cache()
+    cutoff_bucket = cutoff // EXPIRY_BUCKET_SECONDS
+    removed_count = 0
+
+    while _bucket_heap and _bucket_heap[0] < cutoff_bucket:
+        bucket = heapq.heappop(_bucket_heap)
+        for user_id in _expiry_buckets.pop(bucket, ()):
+            _count(cache.pop(user_id), -1)
+            removed_count += 1
+
+    if removed_count:
+        _mark_dirty()
+    return removed_count
+
+
+def clear_old_cache(days=USER_CACHE_TTL_DAYS):
     """
     Eski cache'ni tozalash (days kundan eski)
 
     Args:
         days: Necha kundan eski cache'ni o'chirish
     """
-    from datetime import datetime, timedelta
+    removed_count = _expire_before(int(time.time()) - days * 86400)
+    print(f"[OK] {removed_count} ta eski cache o'chirildi (>{days} kun)")
 
-    cache = load_user_cache()
-    cutoff_date = datetime.now() - timedelta(days=days)
+    return removed_count
 
-    new_cache = {}
-    removed_count = 0
 
-    for user_id, user_data in cache.items():
-        cached_at = user_data.get('cached_at')
-        if cached_at:
-            try:
-                cached_date = datetime.fromisoformat(cached_at)
-                if cached_date >= cutoff_date:
-                    new_cache[user_id] = user_data
-                else:
-                    removed_count += 1
-            except:
-                # Noto'g'ri format bo'lsa, saqlab qolish
-                new_cache[user_id] = user_data
-        else:
-            # cached_at yo'q bo'lsa, saqlab qolish
-            new_cache[user_id] = user_data
-
-    save_user_cache(new_cache)
-    print(f"[OK] {removed_count} ta eski cache o'chirildi (>{days} kun)")
+def expire_user_cache():
+    """
+    Muddati o'tgan userlarni o'chirish (USER_CACHE_TTL_DAYS) - userbot tsiklidan
+    davriy chaqiriladi. Hech narsa eskirmagan bo'lsa, deyarli bepul.
+    """
+    removed_count = _expire_before(int(time.time()) - USER_CACHE_TTL_DAYS * 86400)
+    if removed_count:
+        print(f"[CACHE] {removed_count} ta eskirgan user cache'dan o'chirildi (>{USER_CACHE_TTL_DAYS} kun)")
 
     return removed_count
+
+
+# ============================================================
+# WRITE-BEHIND: faylga yozish
+# ============================================================
+
+def _take_snapshot():
+    """O'zgarishlar bo'lsa, yozish uchun nusxa olish va dirty'ni tozalash"""
+    global _dirty
+    if _cache is None or not _dirty:
+        return None
+    _dirty = False
+    return dict(_cache), dict(_stats)
+
+
+def _merge_foreign_changes(cache, stats):
+    """
+    Fayl yuklangandan beri boshqa jarayon tomonidan o'zgartirilgan bo'lsa,
+    undagi yangiroq (va muddati o'tmagan) yozuvlarni nusxaga qo'shish
+
+    Returns:
+        Qo'shilgan yozuvlar - xotiradagi cache'ga ham qo'shilishi kerak
+    """
+    if _cache_file_mtime() in (None, _file_mtime):
+        return []
+
+    cutoff = int(time.time()) - USER_CACHE_TTL_DAYS * 86400
+    foreign = []
+    for record in _iter_file_records():
+        old = cache.get(record.id)
+        if record.cached_at < cutoff or (old is not None and old.cached_at >= record.cached_at):
+            continue
+        if old is not None:
+            _count(old, -1, stats)
+        cache[record.id] = record
+        _count(record, 1, stats)
+        foreign.append(record)
+
+    if foreign:
+        print(f"[CACHE] Boshqa jarayon yozgan {len(foreign)} ta user birlashtirildi")
+    return foreign
+
+
+def _save_snapshot(snapshot):
+    global _file_mtime
+    cache, stats = snapshot
+    foreign = _merge_foreign_changes(cache, stats)
+    save_user_cache(cache)
+    _file_mtime = _cache_file_mtime()
+    save_cache_stats(stats)
+    return foreign
+
+
+def _adopt_records(records):
+    """Boshqa jarayon yozgan yozuvlarni xotiradagi cache'ga qo'shish (faylda allaqachon bor)"""
+    for record in records:
+        old = _cache.get(record.id)
+        if old is None or old.cached_at < record.cached_at:
+            _put_record(_cache, record)
+
+
+def flush_user_cache():
+    """O'zgarishlarni darhol faylga yozish (sinxron - shutdown va scriptlar uchun)"""
+    snapshot = _take_snapshot()
+    if snapshot is not None:
+        _adopt_records(_save_snapshot(snapshot))
+
+
+async def flush_user_cache_async():
+    """O'zgarishlarni faylga yozish - event loop'ni bloklamasdan (thread'da)"""
+    snapshot = _take_snapshot()
+    if snapshot is not None:
+        _adopt_records(await asyncio.to_thread(_save_snapshot, snapshot))
+
+
+def _acquire_writer_lock():
+    try:
+        os.makedirs(os.path.dirname(USER_CACHE_LOCK_FILE), exist_ok=True)
+        with open(USER_CACHE_LOCK_FILE, 'w', encoding='utf-8') as f:
+            f.write(str(os.getpid()))
+    except Exception as e:
+        print(f"[OGOHLANTIRISH] User cache lock fayli yozilmadi: {e}")
+
+
+def _release_writer_lock():
+    if user_cache_writer_pid(include_self=True) == os.getpid():
+        try:
+            os.remove(USER_CACHE_LOCK_FILE)
+        except OSError:
+            pass
+
+
+def user_cache_writer_pid(include_self=False):
+    """
+    JSON cache'ga fon writer bilan yozayotgan jarayon PID'i
+
+    Returns:
+        PID yoki None (writer ishlamayapti yoki lock fayli eskirgan)
+    """
+    try:
+        with open(USER_CACHE_LOCK_FILE, 'r', encoding='utf-8') as f:
+            pid = int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+    if pid == os.getpid():
+        return pid if include_self else None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None
+    except PermissionError:
+        pass
+    return pid
+
+
+async def run_user_cache_writer(interval=USER_CACHE_FLUSH_INTERVAL):
+    """Fon writer: har `interval` soniyada o'zgarishlarni faylga yozish"""
+    _acquire_writer_lock()
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await flush_user_cache_async()
+    finally:
+        # To'xtatilganda (cancel) oxirgi o'zgarishlarni yozish
+        flush_user_cache()
+        _release_writer_lock()
+
+
+# Dastur to'xtaganda yozilmagan o'zgarishlarni saqlash
+atexit.register(flush_user_cache)
+
+
+# ============================================================
+# BACKEND TANLASH
+# ============================================================
+# USER_CACHE_BACKEND=sqlite - katta cache'lar uchun SQLite (WAL) backend
+if USER_CACHE_BACKEND == "sqlite":
+    from core.user_cache_sqlite import (
+        add_user_to_cache,
+        add_users_bulk,
+        get_user_from_cache,
+        get_cache_stats,
+        clear_old_cache,
+        expire_user_cache,
+        flush_user_cache,
+        flush_user_cache_async,
+        run_user_cache_writer,
+    )
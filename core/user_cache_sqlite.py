@@ -0,0 +1,288 @@
+"""
+User Cache (SQLite backend) - katta FAST guruhlar uchun
+
+JSON cache'ning o'rniga ishlatiladi (USER_CACHE_BACKEND=sqlite):
+- WAL rejim: o'qish va yozish bir-birini bloklamaydi
+- Ko'p userlar `executemany` bilan partiyalab (batch) yoziladi
+- `cached_at` bo'yicha indeks - eski yozuvlarni tez o'chirish
+- Startup'da hech narsa xotiraga yuklanmaydi (doimiy xotira)
+- Statistika triggerlar yuritadigan bitta qatorli jadvalda (COUNT(*) yo'q)
+
+Funksiyalar nomi va natijalari core.user_cache bilan bir xil.
+"""
+import asyncio
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from core.config import USER_CACHE_DB, USER_CACHE_TTL_DAYS
+
+# Bitta executemany partiyasidagi userlar soni
+BULK_BATCH_SIZE = 1000
+
+# WAL checkpoint oralig'i (soniya)
+CHECKPOINT_INTERVAL = 300
+
+_conn = None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    first_name TEXT,
+    last_name TEXT,
+    username TEXT,
+    phone TEXT,
+    is_verified INTEGER NOT NULL DEFAULT 0,
+    is_premium INTEGER NOT NULL DEFAULT 0,
+    cached_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_users_cached_at ON users(cached_at);
+
+CREATE TABLE IF NOT EXISTS cache_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total INTEGER NOT NULL,
+    with_username INTEGER NOT NULL,
+    with_phone INTEGER NOT NULL
+);
+-- Eski bazalar uchun boshlang'ich qiymatlar (bir marta hisoblanadi)
+INSERT OR IGNORE INTO cache_stats (id, total, with_username, with_phone)
+SELECT 1, COUNT(*), COUNT(username), COUNT(phone) FROM users;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_insert AFTER INSERT ON users BEGIN
+    UPDATE cache_stats SET
+        total = total + 1,
+        with_username = with_username + (NEW.username IS NOT NULL),
+        with_phone = with_phone + (NEW.phone IS NOT NULL)
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_delete AFTER DELETE ON users BEGIN
+    UPDATE cache_stats SET
+        total = total - 1,
+        with_username = with_username - (OLD.username IS NOT NULL),
+        with_phone = with_phone - (OLD.phone IS NOT NULL)
+    WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_update AFTER UPDATE OF username, phone ON users BEGIN
+    UPDATE cache_stats SET
+        with_username = with_username + (NEW.username IS NOT NULL) - (OLD.username IS NOT NULL),
+        with_phone = with_phone + (NEW.phone IS NOT NULL) - (OLD.phone IS NOT NULL)
+    WHERE id = 1;
+END;
+"""
+
+_UPSERT_SQL = """
+INSERT INTO users (id, first_name, last_name, username, phone, is_verified, is_premium, cached_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    first_name = excluded.first_name,
+    last_name = excluded.last_name,
+    username = excluded.username,
+    phone = excluded.phone,
+    is_verified = excluded.is_verified,
+    is_premium = excluded.is_premium,
+    cached_at = excluded.cached_at
+"""
+
+
+def _get_conn():
+    """SQLite ulanishi (birinchi chaqiruvda ochiladi va sxema yaratiladi)"""
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(USER_CACHE_DB) or ".", exist_ok=True)
+        _conn = sqlite3.connect(USER_CACHE_DB, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.executescript(_SCHEMA)
+        _conn.commit()
+        _migrate_json_cache(_conn)
+    return _conn
+
+
+def _to_row(user_id, user_data, cached_at):
+    return (
+        int(user_id),
+        user_data.get('first_name') or '',
+        user_data.get('last_name') or '',
+        user_data.get('username'),
+        user_data.get('phone'),
+        1 if user_data.get('is_verified') else 0,
+        1 if user_data.get('is_premium') else 0,
+        cached_at,
+    )
+
+
+def _parse_cached_at(value):
+    """JSON cache'dagi cached_at (epoch yoki ISO sana) -> epoch soniya"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except (TypeError, ValueError):
+        return int(time.time())
+
+
+def _migrate_json_cache(conn):
+    """Bir martalik: baza bo'sh bo'lsa, eski JSON cache'ni import qilish"""
+    from core.user_cache import USER_CACHE_FILE, load_user_cache
+
+    if not os.path.exists(USER_CACHE_FILE):
+        return
+    if conn.execute("SELECT 1 FROM users LIMIT 1").fetchone():
+        return
+
+    cache = load_user_cache()
+    rows = [
+        _to_row(user_id, user_data, _parse_cached_at(user_data.get('cached_at')))
+        for user_id, user_data in cache.items()
+        if str(user_id).lstrip('-').isdigit()
+    ]
+    for i in range(0, len(rows), BULK_BATCH_SIZE):
+        conn.executemany(_UPSERT_SQL, rows[i:i + BULK_BATCH_SIZE])
+    conn.commit()
+    print(f"[OK] JSON user cache SQLite'ga ko'chirildi: {len(rows)} ta user")
+
+
+def _from_row(row):
+    user_id, first_name, last_name, username, phone, is_verified, is_premium, cached_at = row
+    return {
+        'id': user_id,
+        'first_name': first_name,
+        'last_name': last_name,
+        'full_name': f"{first_name} {last_name}".strip() or 'Noma\'lum',
+        'username': username,
+        'phone': phone,
+        'is_verified': bool(is_verified),
+        'is_premium': bool(is_premium),
+        'cached_at': datetime.fromtimestamp(cached_at).isoformat(),
+    }
+
+
+def add_user_to_cache(user_id, user_data):
+    """
+    Bitta userni cache'ga qo'shish
+
+    Args:
+        user_id: User ID (int yoki str)
+        user_data: User ma'lumotlari (dict)
+    """
+    conn = _get_conn()
+    conn.execute(_UPSERT_SQL, _to_row(user_id, user_data, int(time.time())))
+    conn.commit()
+
+
+def add_users_bulk(users_dict, verbose=True):
+    """
+    Ko'p userlarni bir vaqtda qo'shish (partiyalab executemany)
+
+    Args:
+        users_dict: {user_id: user_data, ...}
+        verbose: Natijani chop etish (sahifalab yozishda o'chiriladi)
+    """
+    conn = _get_conn()
+    cached_at = int(time.time())
+
+    batch = []
+    for user_id, user_data in users_dict.items():
+        batch.append(_to_row(user_id, user_data, cached_at))
+        if len(batch) >= BULK_BATCH_SIZE:
+            conn.executemany(_UPSERT_SQL, batch)
+            batch = []
+    if batch:
+        conn.executemany(_UPSERT_SQL, batch)
+
+    conn.commit()
+    if verbose:
+        print(f"[OK] {len(users_dict)} ta user cache'ga qo'shildi")
+
+
+def get_user_from_cache(user_id):
+    """
+    User ma'lumotlarini cache'dan olish (primary key bo'yicha)
+
+    Returns:
+        User ma'lumotlari (dict) yoki None
+    """
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    row = _get_conn().execute(
+        "SELECT id, first_name, last_name, username, phone, is_verified, is_premium, cached_at "
+        "FROM users WHERE id = ?",
+        (user_id,)
+    ).fetchone()
+
+    return _from_row(row) if row else None
+
+
+def get_cache_stats():
+    """Cache statistikasi - triggerlar yuritadigan hisoblagichlardan (O(1))"""
+    total, with_username, with_phone = _get_conn().execute(
+        "SELECT total, with_username, with_phone FROM cache_stats WHERE id = 1"
+    ).fetchone()
+
+    return {
+        'total': total,
+        'with_username': with_username,
+        'with_phone': with_phone
+    }
+
+
+def clear_old_cache(days=USER_CACHE_TTL_DAYS):
+    """
+    Eski cache'ni tozalash (days kundan eski) - cached_at indeksi orqali
+
+    Args:
+        days: Necha kundan eski cache'ni o'chirish
+    """
+    conn = _get_conn()
+    cutoff = int(time.time()) - days * 86400
+
+    cursor = conn.execute("DELETE FROM users WHERE cached_at < ?", (cutoff,))
+    conn.commit()
+
+    removed_count = cursor.rowcount
+    print(f"[OK] {removed_count} ta eski cache o'chirildi (>{days} kun)")
+
+    return removed_count
+
+
+def expire_user_cache():
+    """Muddati o'tgan userlarni o'chirish (USER_CACHE_TTL_DAYS) - indeks orqali"""
+    conn = _get_conn()
+    cutoff = int(time.time()) - USER_CACHE_TTL_DAYS * 86400
+
+    cursor = conn.execute("DELETE FROM users WHERE cached_at < ?", (cutoff,))
+    conn.commit()
+
+    removed_count = cursor.rowcount
+    if removed_count:
+        print(f"[CACHE] {removed_count} ta eskirgan user cache'dan o'chirildi (>{USER_CACHE_TTL_DAYS} kun)")
+
+    return removed_count
+
+
+def flush_user_cache():
+    """SQLite'da har yozuv darhol commit qilinadi - WAL'ni asosiy faylga ko'chirish"""
+    if _conn is not None:
+        _conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+
+async def flush_user_cache_async():
+    """WAL checkpoint - event loop'ni bloklamasdan"""
+    if _conn is not None:
+        await asyncio.to_thread(flush_user_cache)
+
+
+async def run_user_cache_writer(interval=CHECKPOINT_INTERVAL):
+    """Fon vazifa: davriy WAL checkpoint"""
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await flush_user_cache_async()
+    finally:
+        flush_user_cache()
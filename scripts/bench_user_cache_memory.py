@@ -0,0 +1,125 @@
+"""
+User cache xotira benchmarki - bitta user necha bayt egallaydi
+
+Eski format (har user uchun dict + ISO cached_at + full_name) va yangi
+ixcham UserRecord formatini solishtiradi. Yangi format ikki xil o'lchanadi:
+faqat yozuvlar va yozuvlar + muddat savatlari (_put_record yuritadigan
+soatlik set'lar va heap) - ya'ni userbot jarayonidagi haqiqiy narx.
+
+Ishlatish:
+    python -m scripts.bench_user_cache_memory [userlar_soni]
+"""
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import core.user_cache as user_cache
+from core.config import USER_CACHE_TTL_DAYS
+from core.participants import PAGE_SIZE
+from core.user_cache import UserRecord
+
+FIRST_NAMES = ["Anvar", "Jasur", "Dilshod", "Aziz", "Bekzod", "Sardor", "Otabek", "Malika", "Nodira", "Shahzod"]
+LAST_NAMES = ["Karimov", "Aliyev", "Toshmatov", "Yusupov", "Rahimov", "", "", ""]
+
+
+def _fake_users(count):
+    """Tasodifiy userlar (Telethon'dan kelgandek - har biri yangi string)"""
+    random.seed(42)
+    users = {}
+    for i in range(count):
+        user_id = 100000000 + i * 7
+        first_name = "".join(random.choice(FIRST_NAMES))
+        last_name = "".join(random.choice(LAST_NAMES))
+        users[user_id] = {
+            'id': user_id,
+            'first_name': first_name,
+            'last_name': last_name,
+            'full_name': f"{first_name} {last_name}".strip() or 'Noma\'lum',
+            'username': f"@user_{user_id}" if random.random() < 0.6 else None,
+            'phone': f"+99890{user_id % 10000000:07d}" if random.random() < 0.2 else None,
+            'is_verified': False,
+            'is_premium': random.random() < 0.05,
+        }
+    return users
+
+
+def _measure(build):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    cache = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return cache, size
+
+
+def _build_old(users):
+    def build():
+        cache = {}
+        for user_id, user_data in users.items():
+            cache[str(user_id)] = {
+                **{k: (v[:] + '' if isinstance(v, str) else v) for k, v in user_data.items()},
+                "cached_at": datetime.now().isoformat()
+            }
+        return cache
+    return build
+
+
+def _page_timestamps(count):
+    """
+    Har sahifa (PAGE_SIZE user) uchun cached_at - userlar turli sinxronlashlarda
+    kelgani uchun TTL oynasiga tarqalgan (savatlar soni haqiqiy cache'dagidek)
+    """
+    rng = random.Random(7)
+    now = int(time.time())
+    return [now - rng.randrange(USER_CACHE_TTL_DAYS * 86400) for _ in range(count // PAGE_SIZE + 1)]
+
+
+def _build_new(users, with_expiry):
+    timestamps = _page_timestamps(len(users))
+
+    def build():
+        # Modul holatini tozalash - faqat shu cache'ning savatlari o'lchanadi
+        user_cache._expiry_buckets.clear()
+        user_cache._bucket_heap.clear()
+        cache = {}
+        for i, (user_id, user_data) in enumerate(users.items()):
+            record = UserRecord.from_dict(user_id, user_data, timestamps[i // PAGE_SIZE])
+            if with_expiry:
+                user_cache._put_record(cache, record)
+            else:
+                cache[record.id] = record
+        return cache
+    return build
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    users = _fake_users(count)
+
+    old_cache, old_size = _measure(_build_old(users))
+    del old_cache
+    record_cache, record_size = _measure(_build_new(users, with_expiry=False))
+    del record_cache
+    new_cache, new_size = _measure(_build_new(users, with_expiry=True))
+    del new_cache
+    buckets = len(user_cache._expiry_buckets)
+    user_cache._expiry_buckets.clear()
+    user_cache._bucket_heap.clear()
+
+    print("=" * 60)
+    print(f"USER CACHE XOTIRA BENCHMARKI ({count} ta user)")
+    print("=" * 60)
+    print(f"Eski format (dict):          {old_size / count:8.1f} bayt/user  ({old_size / 1024 / 1024:.1f} MB)")
+    print(f"UserRecord (faqat yozuvlar): {record_size / count:8.1f} bayt/user  ({record_size / 1024 / 1024:.1f} MB)")
+    print(f"UserRecord + muddat savatlari: {new_size / count:6.1f} bayt/user  ({new_size / 1024 / 1024:.1f} MB)"
+          f"  [{buckets} ta soatlik savat]")
+    print(f"Tejash (savatlar bilan): {(1 - new_size / old_size) * 100:.0f}%")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
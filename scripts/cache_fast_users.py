@@ -4,16 +4,20 @@ FAST guruhlardan userlarni cache'ga yuklash - STANDALONE SCRIPT
 OGOHLANTIRISH: Bu script faqat UserBot ISHLAMAYOTGANDA ishlatiladi!
 Agar UserBot ishlayotgan bo'lsa, "database is locked" xatolik chiqadi.
 
+JSON backend'da (USER_CACHE_BACKEND=json) userbot cache'ni xotiradan butunlay
+qayta yozadi - script yozgan userlar yo'qoladi. Shuning uchun userbot'ning
+cache writer'i ishlayotgan bo'lsa (data/user_cache.lock), script ishlamaydi.
+Sinxronlash checkpoint'i (sahifa hash'lari) faqat SQLite backend'da saqlanadi.
+
 TAVSIYA: UserBot avtomatik ravishda cache'ni yuklaydi, bu scriptni ishlatish shart emas.
 """
 import asyncio
 import os
 from telethon import TelegramClient
-from telethon.tl.functions.channels import GetParticipantsRequest
-from telethon.tl.types import ChannelParticipantsSearch
-from core.config import USERBOT_API_ID, USERBOT_API_HASH, session_path
+from core.config import USERBOT_API_ID, USERBOT_API_HASH, USER_CACHE_BACKEND, session_path
 from core.storage import load_state
-from core.user_cache import add_users_bulk, get_cache_stats
+from core.user_cache import get_cache_stats, flush_user_cache, user_cache_writer_pid
+from services.participant_sync import ParticipantSync
 
 
 async def cache_users_from_fast_groups():
@@ -32,6 +36,13 @@ async def cache_users_from_fast_groups():
         print(f"    Iltimos, avval UserBot'ni to'xtating.\n")
         return
 
+    # JSON cache'ga userbot yozayotgan bo'lsa, bizning yozuvlarimiz ustidan yoziladi
+    writer_pid = user_cache_writer_pid() if USER_CACHE_BACKEND != "sqlite" else None
+    if writer_pid:
+        print(f"[X] XATOLIK: UserBot JSON user cache'ga yozmoqda (PID {writer_pid})!")
+        print(f"    Avval UserBot'ni to'xtating yoki USER_CACHE_BACKEND=sqlite ishlating.\n")
+        return
+
     client = TelegramClient(session_path, USERBOT_API_ID, USERBOT_API_HASH)
 
     try:
@@ -57,82 +68,13 @@ async def cache_users_from_fast_groups():
         print(f"\n[INFO] {len(fast_groups)} ta FAST guruh topildi")
         print("-" * 60)
 
-        all_users = {}
-
-        for i, group_id in enumerate(fast_groups, 1):
-            print(f"\n[{i}/{len(fast_groups)}] {group_id}")
-
-            try:
-                # Guruhni olish
-                entity = await client.get_entity(group_id)
-                group_title = getattr(entity, 'title', 'Noma\'lum')
-                print(f"  Nomi: {group_title}")
-
-                # Userlarni olish
-                offset = 0
-                batch_size = 200
-                group_user_count = 0
-
-                while True:
-                    try:
-                        participants = await client(GetParticipantsRequest(
-                            channel=entity,
-                            filter=ChannelParticipantsSearch(''),
-                            offset=offset,
-                            limit=batch_size,
-                            hash=0
-                        ))
-
-                        if not participants.users:
-                            break
-
-                        # Har bir userni qayta ishlash
-                        for user in participants.users:
-                            # Bot'larni o'tkazib yuborish
-                            if user.bot:
-                                continue
-
-                            user_id = str(user.id)
-
-                            # Agar user allaqachon cache'da bo'lsa, yangilash
-                            user_data = {
-                                'id': user.id,
-                                'first_name': user.first_name or '',
-                                'last_name': user.last_name or '',
-                                'full_name': f"{user.first_name or ''} {user.last_name or ''}".strip() or 'Noma\'lum',
-                                'username': f"@{user.username}" if user.username else None,
-                                'phone': f"+{user.phone}" if user.phone else None,
-                                'is_verified': getattr(user, 'verified', False),
-                                'is_premium': getattr(user, 'premium', False),
-                            }
-
-                            all_users[user_id] = user_data
-                            group_user_count += 1
-
-                        # Keyingi batch
-                        offset += len(participants.users)
-
-                        # Agar yangi userlar yo'q bo'lsa, to'xtatish
-                        if len(participants.users) < batch_size:
-                            break
-
-                    except Exception as e:
-                        print(f"  [OGOHLANTIRISH] Batch xatolik (offset={offset}): {e}")
-                        break
-
-                print(f"  ✓ {group_user_count} ta user cache'ga qo'shildi")
-
-            except Exception as e:
-                print(f"  [X] Guruh xatolik: {e}")
-
-            # Rate limiting
-            await asyncio.sleep(1)
-
-        # Barcha userlarni bir vaqtda saqlash
-        if all_users:
-            print(f"\n{'-' * 60}")
-            print(f"[SAQLASH] {len(all_users)} ta user cache'ga yozilmoqda...")
-            add_users_bulk(all_users)
+        # UserBot bilan bir xil sinxronlash (parallel). JSON backend'da checkpoint
+        # saqlanmaydi - cache yozilmay qolsa, sahifa hash'lari userlarni yashirmasin
+        sync = ParticipantSync(client, persist_checkpoint=USER_CACHE_BACKEND == "sqlite")
+        total_users = await sync.run(fast_groups)
+
+        if total_users:
+            flush_user_cache()
 
             # Statistika
             stats = get_cache_stats()
@@ -144,7 +86,7 @@ async def cache_users_from_fast_groups():
             print(f"Telefon bor: {stats['with_phone']}")
             print(f"{'=' * 60}\n")
         else:
-            print("\n[INFO] Cache'ga qo'shiladigan userlar topilmadi")
+            print("\n[INFO] Yangi userlar yo'q (sahifalar o'zgarmagan yoki topilmadi)")
 
     except Exception as e:
         print(f"\n[X] XATOLIK: {e}")
@@ -1,26 +1,323 @@
 """
 Source guruhdagi userlarni olish va eksport qilish
 UserBot orqali guruh a'zolarining ma'lumotlarini to'plash
+
+Eksport formatlari:
+- ndjson / csv - oqimli (streaming): har sahifa kelishi bilan faylga yoziladi,
+  xotira guruh hajmiga bog'liq emas, `--resume` bilan davom ettirish mumkin
+- json - bitta hujjat (eski format, userlar xotirada yig'iladi)
+- both - json + csv
+
+Ishlatish:
+    python -m scripts.extract_users                       # interaktiv menyu
+    python -m scripts.extract_users --all --format csv --gzip
+    python -m scripts.extract_users --group -1001234567890 --format ndjson --resume
 """
+import argparse
 import asyncio
-import json
 import csv
+import gzip
+import itertools
+import json
+import os
 from datetime import datetime
 from telethon import TelegramClient
-from telethon.tl.functions.channels import GetParticipantsRequest
-from telethon.tl.types import ChannelParticipantsSearch
-from core.config import USERBOT_API_ID, USERBOT_API_HASH, session_path
+from core.config import (
+    USERBOT_API_ID,
+    USERBOT_API_HASH,
+    session_path,
+    PARTICIPANT_SYNC_RPC_PER_SEC,
+    PARTICIPANT_SYNC_RPC_BURST,
+)
+from core.participants import iter_participant_pages
+from core.rate_limit import TokenBucket
 from core.storage import load_state
 
+EXPORT_FIELDS = [
+    'id', 'first_name', 'last_name', 'full_name', 'username', 'phone',
+    'is_bot', 'is_verified', 'is_premium', 'status',
+]
+
+STREAM_FORMATS = ('ndjson', 'csv')
+
+# Bir vaqtda nechta guruh eksport qilinadi (barcha guruhlar rejimida)
+EXPORT_CONCURRENCY = 3
+
+
+def _user_info(user):
+    return {
+        'id': user.id,
+        'first_name': user.first_name or '',
+        'last_name': user.last_name or '',
+        'full_name': f"{user.first_name or ''} {user.last_name or ''}".strip(),
+        'username': f"@{user.username}" if user.username else None,
+        'phone': f"+{user.phone}" if user.phone else None,
+        'is_bot': user.bot,
+        'is_verified': getattr(user, 'verified', False),
+        'is_premium': getattr(user, 'premium', False),
+        'status': str(user.status.__class__.__name__) if user.status else None,
+    }
+
+
+def _progress_file(entity_id):
+    """Davom ettirish uchun progress fayli (guruh bo'yicha)"""
+    return f"data/export_{entity_id}.progress.json"
+
+
+def _load_progress(entity_id):
+    path = _progress_file(entity_id)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[OGOHLANTIRISH] Progress fayli o'qilmadi: {e}")
+        return None
+
+
+def _save_progress(entity_id, progress):
+    path = _progress_file(entity_id)
+    tmp_file = path + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(progress, f, ensure_ascii=False)
+    os.replace(tmp_file, path)
+
+
+def _open_text(path, append, compress):
+    if compress:
+        # gzip'ga qo'shish yangi "member" yaratadi - fayl to'g'ri o'qiladi
+        return gzip.open(path, 'at' if append else 'wt', encoding='utf-8', newline='')
+    return open(path, 'a' if append else 'w', encoding='utf-8', newline='')
+
+
+def _written_ids(path, fmt, skip_rows):
+    """
+    Fayldagi birinchi `skip_rows` qatordan keyingi userlar ID'lari
+
+    Progress saqlanishidan oldin to'xtagan bo'lsa, oxirgi sahifa faylga
+    yozilgan, lekin progress'da hisobga olinmagan bo'ladi - o'sha qatorlar.
+    """
+    ids = set()
+    try:
+        if path.endswith('.gz'):
+            f = gzip.open(path, 'rt', encoding='utf-8', newline='')
+        else:
+            f = open(path, 'r', encoding='utf-8', newline='')
+        with f:
+            if fmt == 'ndjson':
+                rows = (json.loads(line) for line in f if line.strip())
+            else:
+                rows = csv.DictReader(f)
+            for row in itertools.islice(rows, skip_rows, None):
+                ids.add(int(row['id']))
+    except (OSError, EOFError, ValueError, KeyError, TypeError) as e:
+        # Uzilgan oxirgi qator (crash) - undan oldingilari yetarli
+        print(f"[OGOHLANTIRISH] {path} oxirigacha o'qilmadi: {e}")
+    return ids
+
+
+class StreamExporter:
+    """
+    Sahifalarni NDJSON/CSV fayllarga darhol yozish
+
+    Davom ettirishda (append) progress'dan keyin yozilgan qatorlar ID bo'yicha
+    o'tkazib yuboriladi - qayta yuklangan sahifa faylda takrorlanmaydi.
+    """
+
+    def __init__(self, files, append, written=0):
+        self._handles = []
+        self._csv = None
+        self._ndjson = None
+        self._skip = {}    # {format: progress'dan keyin allaqachon yozilgan ID'lar}
+
+        for fmt, path in files.items():
+            compress = path.endswith('.gz')
+            if append:
+                self._skip[fmt] = _written_ids(path, fmt, written)
+            handle = _open_text(path, append, compress)
+            self._handles.append(handle)
+
+            if fmt == 'ndjson':
+                self._ndjson = handle
+            elif fmt == 'csv':
+                self._csv = csv.DictWriter(handle, fieldnames=EXPORT_FIELDS)
+                if not append:
+                    self._csv.writeheader()
+
+    def _fresh(self, fmt, rows):
+        skip = self._skip.get(fmt)
+        if not skip:
+            return rows
+        fresh = [row for row in rows if row['id'] not in skip]
+        skip.difference_update(row['id'] for row in rows)
+        return fresh
+
+    def write(self, rows):
+        if self._ndjson is not None:
+            self._ndjson.writelines(
+                json.dumps(row, ensure_ascii=False) + "\n" for row in self._fresh('ndjson', rows)
+            )
+        if self._csv is not None:
+            self._csv.writerows(self._fresh('csv', rows))
+
+    def flush(self):
+        for handle in self._handles:
+            handle.flush()
+
+    def close(self):
+        for handle in self._handles:
+            handle.close()
+
+
+def _new_stats():
+    return {'total': 0, 'username': 0, 'phone': 0, 'bot': 0, 'verified': 0, 'premium': 0}
+
+
+def _count(stats, rows):
+    for row in rows:
+        stats['total'] += 1
+        stats['username'] += bool(row['username'])
+        stats['phone'] += bool(row['phone'])
+        stats['bot'] += bool(row['is_bot'])
+        stats['verified'] += bool(row['is_verified'])
+        stats['premium'] += bool(row['is_premium'])
+
+
+def _print_stats(stats):
+    print(f"\n{'=' * 60}")
+    print("STATISTIKA")
+    print(f"{'=' * 60}")
+    print(f"Jami userlar: {stats['total']}")
+    print(f"Username bor: {stats['username']}")
+    print(f"Telefon bor: {stats['phone']}")
+    print(f"Bot'lar: {stats['bot']}")
+    print(f"Verified: {stats['verified']}")
+    print(f"Premium: {stats['premium']}")
+    print(f"{'=' * 60}\n")
+
+
+async def export_group(client, group_id, limit=None, export_format='json',
+                       compress=False, resume=False, budget=None):
+    """
+    Bitta guruhni mavjud client orqali eksport qilish
+
+    Args:
+        client: Ulangan TelegramClient (bir nechta guruh uchun umumiy)
+        group_id: Guruh ID yoki username
+        limit: Maksimal user soni (None = hammasi)
+        export_format: 'json', 'ndjson', 'csv', yoki 'both' (json + csv)
+        compress: Fayllarni gzip qilish (.gz)
+        resume: Oxirgi to'xtagan offset'dan davom ettirish (faqat ndjson/csv)
+        budget: Umumiy TokenBucket (parallel eksport uchun)
+
+    Returns:
+        Statistika (dict)
+    """
+    entity = await client.get_entity(group_id)
+    group_title = getattr(entity, 'title', 'Noma\'lum')
+    print(f"[OK] Guruh topildi: {group_title}")
+
+    formats = ['json', 'csv'] if export_format == 'both' else [export_format]
+    stream_formats = [fmt for fmt in formats if fmt in STREAM_FORMATS]
+    keep_json = 'json' in formats
+
+    if resume and keep_json:
+        print("[OGOHLANTIRISH] --resume faqat ndjson/csv uchun - boshidan boshlanadi")
+        resume = False
+
+    # Davom ettirish: oldingi fayllar va offset progress faylidan olinadi
+    progress = _load_progress(entity.id) if resume else None
+    if progress and progress.get('done'):
+        print("[INFO] Bu guruh eksporti allaqachon tugagan - yangi eksport boshlanadi")
+        progress = None
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    group_name = getattr(entity, 'title', str(group_id)).replace(' ', '_')[:30]
+    suffix = '.gz' if compress else ''
+
+    if progress:
+        files = progress['files']
+        offset = progress['offset']
+        stats = progress['stats']
+        print(f"[INFO] Davom ettirilmoqda: offset={offset}, {stats['total']} ta user yozilgan")
+    else:
+        files = {fmt: f"data/users_{group_name}_{timestamp}.{fmt}{suffix}" for fmt in stream_formats}
+        offset = 0
+        stats = _new_stats()
+        progress = {'group_id': str(entity.id), 'files': files, 'offset': 0, 'stats': stats, 'done': False}
+
+    os.makedirs("data", exist_ok=True)
+    exporter = StreamExporter(files, append=offset > 0, written=stats['total']) if files else None
+    users_data = []
+
+    print(f"\n[JARAYON] Userlar yuklanmoqda...\n")
+
+    try:
+        remaining = None if limit is None else max(limit - stats['total'], 0)
+        async for page in iter_participant_pages(client, entity, offset=offset, limit=remaining, budget=budget):
+            if not page.users:
+                # Oxirgi bo'sh javob - faqat a'zolar soni
+                continue
+            rows = [_user_info(user) for user in page.users]
+
+            if exporter is not None:
+                exporter.write(rows)
+                exporter.flush()
+            if keep_json:
+                users_data.extend(rows)
+            _count(stats, rows)
+
+            offset = page.next_offset
+            if exporter is not None:
+                progress['offset'] = offset
+                _save_progress(entity.id, progress)
+
+            print(f"  ✓ {group_title}: {stats['total']} ta user yuklandi...")
+
+        progress['done'] = True
+
+    except Exception as e:
+        print(f"\n[OGOHLANTIRISH] Batch yuklashda xatolik (offset={offset}): {e}")
+        if exporter is not None:
+            print(f"    Davom ettirish uchun: --resume --group {group_id}")
+
+    finally:
+        if exporter is not None:
+            exporter.close()
+            _save_progress(entity.id, progress)
+
+    print(f"\n[OK] Jami {stats['total']} ta user toplandi")
+
+    for fmt, path in files.items():
+        print(f"[SAQLANDI] {fmt.upper()}: {path}")
 
-async def extract_users_from_group(group_id, limit=None, export_format='json'):
+    # JSON eksport (bitta hujjat)
+    if keep_json:
+        json_file = f"data/users_{group_name}_{timestamp}.json{suffix}"
+        with _open_text(json_file, False, compress) as f:
+            json.dump({
+                'group_id': str(entity.id),
+                'group_name': group_title,
+                'extracted_at': datetime.now().isoformat(),
+                'total_users': len(users_data),
+                'users': users_data
+            }, f, ensure_ascii=False, indent=2)
+        print(f"[SAQLANDI] JSON: {json_file}")
+
+    return stats
+
+
+async def extract_users_from_group(group_id, limit=None, export_format='json', compress=False, resume=False):
     """
     Guruhdan userlarni olish
 
     Args:
         group_id: Guruh ID yoki username
         limit: Maksimal user soni (None = hammasi)
-        export_format: 'json', 'csv', yoki 'both'
+        export_format: 'json', 'ndjson', 'csv', yoki 'both'
+        compress: Fayllarni gzip qilish
+        resume: Oxirgi to'xtagan joydan davom ettirish
     """
     print("=" * 60)
     print("SOURCE GURUH USERLARINI OLISH")
@@ -34,115 +331,8 @@ async def extract_users_from_group(group_id, limit=None, export_format='json'):
     print(f"[INFO] Limit: {limit if limit else 'Cheksiz (hammasi)'}\n")
 
     try:
-        # Guruhni olish
-        entity = await client.get_entity(group_id)
-        print(f"[OK] Guruh topildi: {getattr(entity, 'title', 'Noma\'lum')}")
-
-        # A'zolarni to'plash
-        users_data = []
-        offset = 0
-        batch_size = 200  # Telegram har safar max 200 ta user beradi
-
-        print(f"\n[JARAYON] Userlar yuklanmoqda...\n")
-
-        while True:
-            try:
-                # A'zolarni olish
-                participants = await client(GetParticipantsRequest(
-                    channel=entity,
-                    filter=ChannelParticipantsSearch(''),
-                    offset=offset,
-                    limit=batch_size,
-                    hash=0
-                ))
-
-                if not participants.users:
-                    break
-
-                # Har bir userni qayta ishlash
-                for user in participants.users:
-                    # Bot'larni o'tkazib yuborish (agar kerak bo'lsa)
-                    # if user.bot:
-                    #     continue
-
-                    user_info = {
-                        'id': user.id,
-                        'first_name': user.first_name or '',
-                        'last_name': user.last_name or '',
-                        'full_name': f"{user.first_name or ''} {user.last_name or ''}".strip(),
-                        'username': f"@{user.username}" if user.username else None,
-                        'phone': f"+{user.phone}" if user.phone else None,
-                        'is_bot': user.bot,
-                        'is_verified': getattr(user, 'verified', False),
-                        'is_premium': getattr(user, 'premium', False),
-                        'status': str(user.status.__class__.__name__) if user.status else None,
-                    }
-
-                    users_data.append(user_info)
-
-                    # Progress ko'rsatish
-                    if len(users_data) % 100 == 0:
-                        print(f"  ✓ {len(users_data)} ta user yuklandi...")
-
-                    # Limit tekshirish
-                    if limit and len(users_data) >= limit:
-                        break
-
-                # Limit yetgan bo'lsa, to'xtatish
-                if limit and len(users_data) >= limit:
-                    break
-
-                # Keyingi batch
-                offset += len(participants.users)
-
-                # Agar yangi userlar yo'q bo'lsa, to'xtatish
-                if len(participants.users) < batch_size:
-                    break
-
-            except Exception as e:
-                print(f"\n[OGOHLANTIRISH] Batch yuklashda xatolik (offset={offset}): {e}")
-                break
-
-        print(f"\n[OK] Jami {len(users_data)} ta user toplandi")
-
-        # Eksport qilish
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        group_name = getattr(entity, 'title', str(group_id)).replace(' ', '_')[:30]
-
-        # JSON eksport
-        if export_format in ['json', 'both']:
-            json_file = f"data/users_{group_name}_{timestamp}.json"
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'group_id': str(entity.id),
-                    'group_name': getattr(entity, 'title', 'Noma\'lum'),
-                    'extracted_at': datetime.now().isoformat(),
-                    'total_users': len(users_data),
-                    'users': users_data
-                }, f, ensure_ascii=False, indent=2)
-            print(f"\n[SAQLANDI] JSON: {json_file}")
-
-        # CSV eksport
-        if export_format in ['csv', 'both']:
-            csv_file = f"data/users_{group_name}_{timestamp}.csv"
-            with open(csv_file, 'w', newline='', encoding='utf-8-sig') as f:
-                if users_data:
-                    writer = csv.DictWriter(f, fieldnames=users_data[0].keys())
-                    writer.writeheader()
-                    writer.writerows(users_data)
-            print(f"[SAQLANDI] CSV: {csv_file}")
-
-        # Statistika
-        print(f"\n{'=' * 60}")
-        print("STATISTIKA")
-        print(f"{'=' * 60}")
-        print(f"Jami userlar: {len(users_data)}")
-        print(f"Username bor: {sum(1 for u in users_data if u['username'])}")
-        print(f"Telefon bor: {sum(1 for u in users_data if u['phone'])}")
-        print(f"Bot'lar: {sum(1 for u in users_data if u['is_bot'])}")
-        print(f"Verified: {sum(1 for u in users_data if u['is_verified'])}")
-        print(f"Premium: {sum(1 for u in users_data if u['is_premium'])}")
-        print(f"{'=' * 60}\n")
+        stats = await export_group(client, group_id, limit, export_format, compress, resume)
+        _print_stats(stats)
 
     except Exception as e:
         print(f"\n[X] XATOLIK: {e}")
@@ -154,8 +344,9 @@ async def extract_users_from_group(group_id, limit=None, export_format='json'):
         print("[TUGADI] UserBot uzildi")
 
 
-async def extract_from_all_source_groups():
-    """Barcha source guruhlardan userlarni olish"""
+async def extract_from_all_source_groups(export_format='ndjson', compress=False, resume=False,
+                                         concurrency=EXPORT_CONCURRENCY):
+    """Barcha source guruhlardan userlarni olish (bitta client, parallel guruhlar)"""
     state = load_state()
     source_groups = state.get("source_groups", [])
 
@@ -167,9 +358,17 @@ async def extract_from_all_source_groups():
     print("=" * 60)
     print("BARCHA SOURCE GURUHLARDAN USERLARNI OLISH")
     print("=" * 60)
-    print(f"\nJami {len(source_groups)} ta source guruh topildi\n")
+    print(f"\nJami {len(source_groups)} ta source guruh topildi (bir vaqtda {concurrency} ta)\n")
 
-    for i, group in enumerate(source_groups, 1):
+    client = TelegramClient(session_path, USERBOT_API_ID, USERBOT_API_HASH)
+    await client.start()
+    print(f"[OK] UserBot ulandi\n")
+
+    # Barcha guruhlar bitta RPC byudjetini ulashadi (2s uxlash o'rniga)
+    budget = TokenBucket(PARTICIPANT_SYNC_RPC_PER_SEC, PARTICIPANT_SYNC_RPC_BURST)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def export_one(i, group):
         if isinstance(group, dict):
             group_id = group.get("id")
             group_type = group.get("type", "normal")
@@ -177,13 +376,27 @@ async def extract_from_all_source_groups():
             group_id = group
             group_type = "normal"
 
-        print(f"\n[{i}/{len(source_groups)}] {group_id} ({group_type})")
-        print("-" * 60)
+        async with semaphore:
+            print(f"\n[{i}/{len(source_groups)}] {group_id} ({group_type})")
+            try:
+                return await export_group(client, group_id, None, export_format, compress, resume, budget)
+            except Exception as e:
+                print(f"[X] {group_id} xatolik: {e}")
+                return None
+
+    try:
+        results = await asyncio.gather(*(export_one(i, group) for i, group in enumerate(source_groups, 1)))
 
-        await extract_users_from_group(group_id, limit=None, export_format='json')
+        total = _new_stats()
+        for stats in results:
+            if stats:
+                for key in total:
+                    total[key] += stats[key]
+        _print_stats(total)
 
-        # Rate limiting uchun biroz kutish
-        await asyncio.sleep(2)
+    finally:
+        await client.disconnect()
+        print("[TUGADI] UserBot uzildi")
 
     print("\n" + "=" * 60)
     print("BARCHA GURUHLAR QAYTA ISHLANDI")
@@ -230,7 +443,7 @@ async def main():
             limit_input = input().strip()
             limit = int(limit_input) if limit_input else None
 
-            print("\nFormat (json/csv/both) [json]: ", end='')
+            print("\nFormat (json/ndjson/csv/both) [json]: ", end='')
             fmt = input().strip() or 'json'
 
             await extract_users_from_group(group_id, limit, fmt)
@@ -248,7 +461,7 @@ async def main():
         limit_input = input().strip()
         limit = int(limit_input) if limit_input else None
 
-        print("Format (json/csv/both) [json]: ", end='')
+        print("Format (json/ndjson/csv/both) [json]: ", end='')
         fmt = input().strip() or 'json'
 
         await extract_users_from_group(group_id, limit, fmt)
@@ -257,5 +470,29 @@ async def main():
         print("[!] Noto'g'ri tanlov!")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Source guruh userlarini eksport qilish")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--group", help="Guruh ID yoki username")
+    target.add_argument("--all", action="store_true", help="Barcha source guruhlar")
+    parser.add_argument("--format", default="ndjson", choices=["json", "ndjson", "csv", "both"],
+                        help="Eksport formati (default: ndjson)")
+    parser.add_argument("--limit", type=int, help="Maksimal user soni")
+    parser.add_argument("--gzip", action="store_true", help="Fayllarni gzip qilish")
+    parser.add_argument("--resume", action="store_true", help="Oxirgi offset'dan davom ettirish")
+    parser.add_argument("--concurrency", type=int, default=EXPORT_CONCURRENCY,
+                        help="--all rejimida bir vaqtda nechta guruh")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = parse_args()
+
+    if args.all:
+        asyncio.run(extract_from_all_source_groups(args.format, args.gzip, args.resume, args.concurrency))
+    elif args.group:
+        group_id = int(args.group) if args.group.lstrip('-').isdigit() else args.group
+        asyncio.run(extract_users_from_group(group_id, args.limit, args.format, args.gzip, args.resume))
+    else:
+        # Argumentsiz - interaktiv menyu
+        asyncio.run(main())
@@ -9,12 +9,14 @@ Ishlatish:
 
 import asyncio
 from telethon import TelegramClient
-from telethon.tl.functions.channels import GetParticipantsRequest, EditBannedRequest
-from telethon.tl.types import ChannelParticipantsSearch, ChatBannedRights
+from telethon.tl.functions.channels import EditBannedRequest
+from telethon.tl.types import ChatBannedRights
 from datetime import datetime, timedelta
 import json
 from pathlib import Path
 
+from core.participants import iter_participant_pages
+
 # API credentials (userbot.py dan)
 api_id = 35590072
 api_hash = "48e5dad8bef68a54aac5b2ce0702b82c"
@@ -70,29 +72,9 @@ async def kick_expired_users():
         approved_user_ids = set(int(uid) for uid in approved_users.keys())
 
         # Guruh a'zolarini olish
-        all_participants = []
-        offset = 0
-        limit = 100
-
         print("📥 Guruh a'zolarini olish...")
 
-        while True:
-            participants = await client(GetParticipantsRequest(
-                channel=group,
-                filter=ChannelParticipantsSearch(''),
-                offset=offset,
-                limit=limit,
-                hash=0
-            ))
-
-            if not participants.users:
-                break
-
-            all_participants.extend(participants.users)
-            offset += len(participants.users)
-
-            if len(participants.users) < limit:
-                break
+        all_participants = [user async for page in iter_participant_pages(client, group) for user in page.users]
 
         print(f"👥 Jami a'zolar: {len(all_participants)} ta")
 
@@ -226,26 +208,7 @@ async def get_group_stats():
         approved_user_ids = set(int(uid) for uid in approved_users.keys())
 
         # Guruh a'zolari
-        all_participants = []
-        offset = 0
-
-        while True:
-            participants = await client(GetParticipantsRequest(
-                channel=group,
-                filter=ChannelParticipantsSearch(''),
-                offset=offset,
-                limit=100,
-                hash=0
-            ))
-
-            if not participants.users:
-                break
-
-            all_participants.extend(participants.users)
-            offset += len(participants.users)
-
-            if len(participants.users) < 100:
-                break
+        all_participants = [user async for page in iter_participant_pages(client, group) for user in page.users]
 
         # Statistika
         now = datetime.now()
@@ -0,0 +1,217 @@
+"""
+Delivery Queue - target guruhlarga xabar yetkazish navbati
+
+Xususiyatlar:
+- Har bir target chat uchun alohida navbat va worker
+- FAST guruh xabarlari NORMAL'dan oldin yuboriladi (priority)
+- Token bucket: har bir chat va umumiy (global) tezlik cheklovi
+- FloodWait: umumiy flood darvozasi (core.rate_limit) `seconds` ga yopiladi -
+  barcha target workerlari kutadi, xabar qayta yuboriladi
+- Fan-out: bitta xabar barcha targetlarga parallel yuboriladi
+  (bir vaqtda DELIVERY_MAX_IN_FLIGHT tagacha so'rov)
+"""
+
+import asyncio
+import itertools
+from collections import namedtuple
+
+from telethon.errors import (
+    ChatWriteForbiddenError,
+    UserNotParticipantError,
+    ChannelPrivateError,
+)
+
+from core.config import (
+    DELIVERY_CHAT_RATE_PER_MIN,
+    DELIVERY_CHAT_BURST,
+    DELIVERY_GLOBAL_RATE_PER_SEC,
+    DELIVERY_GLOBAL_BURST,
+    DELIVERY_MAX_IN_FLIGHT,
+)
+from core.rate_limit import (
+    TokenBucket,
+    get_flood_wait_seconds,
+    hold_flood_gate,
+    wait_flood_gate,
+    FLOOD_WAIT_MAX_SECONDS,
+)
+
+# Navbat ustuvorligi (kichik = birinchi)
+PRIORITY_FAST = 0
+PRIORITY_NORMAL = 1
+
+# FloodWait'dan keyin necha marta qayta urinish
+MAX_FLOOD_RETRIES = 3
+
+# To'xtatishda navbatdagi xabarlarni yetkazish uchun kutish, soniya
+STOP_DRAIN_TIMEOUT = 10
+
+# Yetkazish natijasi: ok=True bo'lsa message - yuborilgan xabar, aks holda error
+DeliveryResult = namedtuple("DeliveryResult", ["target", "ok", "message", "error"])
+
+
+def _resolve(future, result):
+    # Chaqiruvchi future'ni bekor qilgan bo'lishi mumkin
+    if not future.done():
+        future.set_result(result)
+
+
+class DeliveryQueue:
+    """
+    Target chatlar bo'yicha xabar yetkazish navbati
+
+    Ishlatish:
+        delivery = DeliveryQueue(client)
+        result = await delivery.submit(target_id, caption, priority=PRIORITY_FAST, parse_mode='html')
+    """
+
+    def __init__(self, client,
+                 chat_rate_per_min=DELIVERY_CHAT_RATE_PER_MIN,
+                 chat_burst=DELIVERY_CHAT_BURST,
+                 global_rate_per_sec=DELIVERY_GLOBAL_RATE_PER_SEC,
+                 global_burst=DELIVERY_GLOBAL_BURST,
+                 max_in_flight=DELIVERY_MAX_IN_FLIGHT):
+        self.client = client
+        self.chat_rate = chat_rate_per_min / 60
+        self.chat_burst = chat_burst
+        self.global_bucket = TokenBucket(global_rate_per_sec, global_burst)
+        # Bir vaqtda yuborilayotgan so'rovlar chegarasi (barcha targetlar bo'yicha)
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+
+        self._queues = {}     # {target: asyncio.PriorityQueue}
+        self._buckets = {}    # {target: TokenBucket}
+        self._workers = {}    # {target: asyncio.Task}
+        self._sequence = itertools.count()
+
+    def submit(self, target, text, priority=PRIORITY_NORMAL, **send_kwargs):
+        """
+        Xabarni navbatga qo'yish
+
+        Args:
+            target: Target chat (int ID yoki username)
+            text: Xabar matni
+            priority: PRIORITY_FAST yoki PRIORITY_NORMAL
+            send_kwargs: client.send_message parametrlari (parse_mode, link_preview, ...)
+
+        Returns:
+            asyncio.Future -> DeliveryResult (hech qachon exception bermaydi)
+        """
+        future = asyncio.get_running_loop().create_future()
+
+        queue = self._queues.get(target)
+        if queue is None:
+            queue = self._queues[target] = asyncio.PriorityQueue()
+            self._buckets[target] = TokenBucket(self.chat_rate, self.chat_burst)
+
+        # seq - bir xil ustuvorlikda kelish tartibini saqlash uchun
+        queue.put_nowait((priority, next(self._sequence), text, send_kwargs, future, 0))
+
+        worker = self._workers.get(target)
+        if worker is None or worker.done():
+            self._workers[target] = asyncio.create_task(self._worker(target))
+
+        return future
+
+    async def fan_out(self, targets, text, priority=PRIORITY_NORMAL, **send_kwargs):
+        """
+        Bitta xabarni barcha targetlarga parallel yuborish
+
+        Har bir target o'z navbatida ishlaydi, shuning uchun oxirgi target
+        oldingilarining javobini kutmaydi.
+
+        Returns:
+            [DeliveryResult, ...] - targets tartibida
+        """
+        futures = [self.submit(target, text, priority, **send_kwargs) for target in targets]
+        return await asyncio.gather(*futures)
+
+    def pending(self):
+        """Navbatdagi xabarlar soni (barcha targetlar)"""
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    async def _worker(self, target):
+        queue = self._queues[target]
+        bucket = self._buckets[target]
+
+        while True:
+            item = await queue.get()
+            priority, seq, text, send_kwargs, future, attempt = item
+            sending = False
+            try:
+                await bucket.acquire()
+                await self.global_bucket.acquire()
+
+                # Hisob flood'da bo'lsa - barcha targetlar kutadi
+                await wait_flood_gate()
+
+                async with self._in_flight:
+                    sending = True
+                    sent = await self.client.send_message(entity=target, message=text, **send_kwargs)
+                _resolve(future, DeliveryResult(target, True, sent, None))
+
+            except asyncio.CancelledError:
+                # stop(): hali yuborilmagan xabar navbatga qaytadi (yetkazilmagan deb hisoblanadi)
+                if not sending:
+                    queue.put_nowait(item)
+                raise
+
+            except Exception as e:
+                seconds = get_flood_wait_seconds(e)
+                if seconds is not None and attempt < MAX_FLOOD_RETRIES and seconds <= FLOOD_WAIT_MAX_SECONDS:
+                    # FloodWait butun hisobga tegishli: umumiy darvozani yopib,
+                    # xabarni o'z o'rniga qaytarish (keyingi urinish darvozani kutadi)
+                    print(f"[FLOOD] Target {target}: {seconds}s kutilmoqda ({attempt + 1}/{MAX_FLOOD_RETRIES})")
+                    hold_flood_gate(seconds + 1)
+                    queue.put_nowait((priority, seq, text, send_kwargs, future, attempt + 1))
+                else:
+                    self._log_error(target, e)
+                    _resolve(future, DeliveryResult(target, False, None, e))
+
+            finally:
+                queue.task_done()
+
+    @staticmethod
+    def _log_error(target, error):
+        error_msg = str(error)
+        if isinstance(error, ChatWriteForbiddenError):
+            print(f"[X] Target {target} yozish huquqi yo'q: {error_msg}")
+            print(f"    YECHIM: UserBot'ni guruhga admin qiling yoki yozish huquqini bering")
+        elif isinstance(error, (UserNotParticipantError, ChannelPrivateError)):
+            print(f"[X] Target {target} UserBot a'zo emas: {error_msg}")
+            print(f"    YECHIM: UserBot'ni guruhga qo'shing")
+        elif get_flood_wait_seconds(error) is not None:
+            print(f"[X] Target {target} FloodWait xatolik: {error_msg}")
+            print(f"    YECHIM: Biroz kutib, qaytadan urinib ko'ring")
+        else:
+            print(f"[X] Target xatolik {target}: {error_msg}")
+
+    async def stop(self, timeout=STOP_DRAIN_TIMEOUT):
+        """
+        Navbatdagi xabarlarni `timeout` soniyagacha yetkazishga urinib,
+        barcha workerlarni to'xtatish. Qolgan xabarlar ok=False bilan yakunlanadi.
+
+        Returns:
+            Yetkazilmay qolgan xabarlar soni
+        """
+        if self.pending() and timeout > 0:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(queue.join() for queue in self._queues.values())), timeout
+                )
+            except asyncio.TimeoutError:
+                pass
+
+        for worker in self._workers.values():
+            worker.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
+
+        undelivered = 0
+        error = RuntimeError("Delivery navbati to'xtatildi")
+        for target, queue in self._queues.items():
+            while not queue.empty():
+                future = queue.get_nowait()[4]
+                queue.task_done()
+                _resolve(future, DeliveryResult(target, False, None, error))
+                undelivered += 1
+        return undelivered
@@ -0,0 +1,311 @@
+"""
+Participant Sync - FAST guruh a'zolarini user cache'ga yuklash
+
+Xususiyatlar:
+- Guruhlar parallel o'qiladi (PARTICIPANT_SYNC_CONCURRENCY)
+- Barcha guruhlar uchun umumiy RPC byudjeti (token bucket) + FloodWait
+- Har bir sahifa darhol user cache'ga yoziladi (hammasi xotirada yig'ilmaydi)
+- Checkpoint: har guruh uchun offset saqlanadi - crash/restart'dan keyin
+  sinxronlash to'xtagan joyidan davom etadi
+- Delta: har sahifa ID hash'i saqlanadi va keyingi safar yuboriladi -
+  o'zgarmagan sahifalar qayta yuklanmaydi (ChannelParticipantsNotModified)
+- Har guruhning oxirgi ma'lum a'zolar soni checkpoint'da saqlanadi (member_counts) -
+  barcha sahifalar o'zgarmagan bo'lsa ham katta guruh aniqlanadi
+- persist_checkpoint=False: checkpoint faylga yozilmaydi - cache yozuvlari
+  boshqa jarayon tomonidan ustidan yozilishi mumkin bo'lsa, sahifa hash'lari
+  yo'qolgan userlarni "o'zgarmagan" deb ko'rsatmasligi uchun
+- 10 000 dan katta guruhlar: bo'sh qidiruv faqat ~10k a'zoni beradi, qolganlari
+  prefiks qidiruvi (lotin, kirill, raqamlar) bilan parallel topiladi
+"""
+
+import asyncio
+import json
+import os
+import time
+
+from core.config import (
+    PARTICIPANT_SYNC_CONCURRENCY,
+    PARTICIPANT_SYNC_RPC_PER_SEC,
+    PARTICIPANT_SYNC_RPC_BURST,
+)
+from core.participants import iter_participant_pages, PAGE_SIZE
+from core.rate_limit import TokenBucket, call_with_flood_wait
+from core.user_cache import add_users_bulk, USER_CACHE_TTL_DAYS
+
+CHECKPOINT_FILE = "data/participant_sync.json"
+
+# Bundan eski tugallanmagan sinxronlash davom ettirilmaydi (boshidan boshlanadi)
+RESUME_MAX_AGE = 24 * 3600
+
+# Sahifa hash'i shundan eski bo'lsa, sahifa to'liq qayta yuklanadi -
+# o'zgarmagan userlarning cached_at'i ham yangilanadi (TTL bo'yicha o'chmasligi uchun)
+PAGE_HASH_MAX_AGE = USER_CACHE_TTL_DAYS * 86400 // 2
+
+# Prefiks qidiruvi alifbolari (o'zbek kirill harflari bilan)
+LATIN_LETTERS = "abcdefghijklmnopqrstuvwxyz"
+CYRILLIC_LETTERS = "абвгдеёжзийклмнопрстуфхцчшщъыьэюяўқғҳ"
+DIGITS = "0123456789"
+
+# Bitta prefiks uchun nechta sahifa o'qiladi; hammasi to'la bo'lsa - prefiks uzaytiriladi
+PREFIX_PAGES = 5
+MAX_PREFIX_DEPTH = 4
+
+
+def user_to_cache_data(user):
+    """Telethon User -> user cache formati"""
+    return {
+        'id': user.id,
+        'first_name': user.first_name or '',
+        'last_name': user.last_name or '',
+        'full_name': f"{user.first_name or ''} {user.last_name or ''}".strip() or 'Noma\'lum',
+        'username': f"@{user.username}" if user.username else None,
+        'phone': f"+{user.phone}" if user.phone else None,
+        'is_verified': getattr(user, 'verified', False),
+        'is_premium': getattr(user, 'premium', False),
+    }
+
+
+def _child_letters(query):
+    """Prefiksni uzaytirish uchun harflar (prefiks yozuvi bo'yicha)"""
+    if not query:
+        return LATIN_LETTERS + CYRILLIC_LETTERS + DIGITS
+    if query[0] in CYRILLIC_LETTERS:
+        return CYRILLIC_LETTERS + DIGITS
+    return LATIN_LETTERS + DIGITS
+
+
+def load_checkpoint():
+    """Checkpoint'ni yuklash"""
+    if not os.path.exists(CHECKPOINT_FILE):
+        return {}
+
+    try:
+        with open(CHECKPOINT_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[OGOHLANTIRISH] Sync checkpoint yuklanmadi: {e}")
+        return {}
+
+
+def save_checkpoint(checkpoint):
+    """Checkpoint'ni saqlash (vaqtinchalik faylga yozib, keyin almashtirish)"""
+    try:
+        os.makedirs(os.path.dirname(CHECKPOINT_FILE), exist_ok=True)
+        tmp_file = CHECKPOINT_FILE + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+        os.replace(tmp_file, CHECKPOINT_FILE)
+    except Exception as e:
+        print(f"[OGOHLANTIRISH] Sync checkpoint saqlanmadi: {e}")
+
+
+class ParticipantSync:
+    """
+    FAST guruhlar a'zolarini sinxronlash
+
+    Ishlatish:
+        total = await ParticipantSync(client).run(fast_groups)
+    """
+
+    def __init__(self, client,
+                 concurrency=PARTICIPANT_SYNC_CONCURRENCY,
+                 rpc_per_sec=PARTICIPANT_SYNC_RPC_PER_SEC,
+                 rpc_burst=PARTICIPANT_SYNC_RPC_BURST,
+                 persist_checkpoint=True):
+        self.client = client
+        self.persist_checkpoint = persist_checkpoint
+        self.budget = TokenBucket(rpc_per_sec, rpc_burst)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._save_lock = asyncio.Lock()
+        self.checkpoint = {}
+
+    async def _rpc(self, func, *args):
+        # Har bir so'rov umumiy byudjetdan bitta token oladi
+        await self.budget.acquire()
+        return await call_with_flood_wait(func, *args)
+
+    async def _save(self):
+        if not self.persist_checkpoint:
+            return
+        # Nusxa loop'da olinadi, faylga yozish thread'da
+        snapshot = json.loads(json.dumps(self.checkpoint))
+        async with self._save_lock:
+            await asyncio.to_thread(save_checkpoint, snapshot)
+
+    def _start_run(self, group_keys):
+        """Yangi sinxronlash yoki tugallanmaganini davom ettirish"""
+        checkpoint = load_checkpoint() if self.persist_checkpoint else {}
+        groups = checkpoint.get('groups', {})
+        # Sahifa hash'lari va a'zolar soni sinxronlashlar orasida saqlanib qoladi
+        page_hashes = checkpoint.get('page_hashes', {})
+        member_counts = checkpoint.get('member_counts', {})
+
+        expired = time.time() - checkpoint.get('started_at', 0) > RESUME_MAX_AGE
+        if checkpoint.get('finished', True) or expired:
+            # Oldingi sinxronlash tugagan - hammasi boshidan
+            checkpoint = {'started_at': int(time.time()), 'finished': False, 'groups': {},
+                          'page_hashes': page_hashes, 'member_counts': member_counts}
+            groups = checkpoint['groups']
+            for key in group_keys:
+                groups[key] = {'offset': 0, 'done': False}
+        else:
+            resumed = [key for key in group_keys if key in groups and not groups[key].get('done')]
+            if resumed:
+                print(f"[SYNC] Tugallanmagan sinxronlash davom ettirilmoqda ({len(resumed)} ta guruh)")
+            for key in group_keys:
+                groups.setdefault(key, {'offset': 0, 'done': False})
+
+        checkpoint.setdefault('page_hashes', page_hashes)
+        checkpoint.setdefault('member_counts', member_counts)
+        self.checkpoint = checkpoint
+
+    async def _sync_group(self, group_id):
+        """Bitta guruh a'zolarini sahifalab cache'ga yozish"""
+        key = str(group_id)
+        progress = self.checkpoint['groups'][key]
+        if progress.get('done'):
+            return 0
+
+        # {offset: [hash, sahifadagi a'zolar soni, yuklangan vaqt]}
+        hashes = self.checkpoint['page_hashes'].setdefault(key, {})
+        member_counts = self.checkpoint['member_counts']
+
+        async with self._semaphore:
+            try:
+                entity = await self._rpc(self.client.get_entity, group_id)
+            except Exception as e:
+                print(f"  [X] {group_id} guruh xatolik: {e}")
+                return 0
+
+            group_title = getattr(entity, 'title', 'Noma\'lum')
+            offset = progress.get('offset', 0)
+            group_user_count = 0
+            unchanged_pages = 0
+
+            if not progress.get('walked'):
+                try:
+                    async for page in iter_participant_pages(
+                            self.client, entity, offset=offset, budget=self.budget,
+                            page_hashes=hashes, hash_max_age=PAGE_HASH_MAX_AGE):
+                        if page.total:
+                            # Server aytgan a'zolar soni (oxirgi bo'sh javobda ham keladi)
+                            progress['total'] = page.total
+                            member_counts[key] = page.total
+
+                        if page.not_modified:
+                            # Sahifa o'zgarmagan - userlar cache'da bor
+                            unchanged_pages += 1
+                        else:
+                            users = {user.id: user_to_cache_data(user) for user in page.users if not user.bot}
+                            if users:
+                                add_users_bulk(users, verbose=False)
+                                group_user_count += len(users)
+
+                        offset = page.next_offset
+                        progress['offset'] = offset
+                        await self._save()
+                except Exception as e:
+                    # Offset checkpoint'da qoladi - keyingi safar shu joydan davom etadi
+                    print(f"  [OGOHLANTIRISH] {group_title}: batch xatolik (offset={offset}): {e}")
+                    return group_user_count
+
+                # Guruh kichraygan bo'lsa, keraksiz sahifa hash'larini o'chirish
+                for stale in [o for o in hashes if int(o) >= offset]:
+                    del hashes[stale]
+                progress['walked'] = True
+                await self._save()
+
+            # Bo'sh qidiruv chegarasiga yetildi - qolgan a'zolar prefiks qidiruvi bilan.
+            # Sahifalar o'zgarmagan bo'lsa total shu safar kelmagan bo'lishi mumkin -
+            # oxirgi ma'lum son ishlatiladi
+            total = progress.get('total') or member_counts.get(key, 0)
+            if total > offset:
+                print(f"  [SYNC] {group_title}: {total} a'zo, bo'sh qidiruv {offset} tasini berdi - "
+                      f"prefiks qidiruvi boshlanmoqda")
+                searched, complete = await self._enumerate_prefixes(entity, progress)
+                group_user_count += searched
+                if not complete:
+                    # Tugallanmagan prefikslar keyingi safar davom ettiriladi
+                    print(f"  [OGOHLANTIRISH] {group_title}: prefiks qidiruvi to'liq tugamadi")
+                    return group_user_count
+
+            progress['done'] = True
+            await self._save()
+
+            print(f"  ✓ {group_title}: {group_user_count} ta user cache'ga qo'shildi"
+                  f" ({unchanged_pages} ta sahifa o'zgarmagan)")
+            return group_user_count
+
+    async def _enumerate_prefixes(self, entity, progress):
+        """
+        Prefiks qidiruvi: har prefiks PREFIX_PAGES sahifagacha o'qiladi, natija
+        to'la bo'lsa (chegaraga yetgan) - bir harf uzunroq prefikslarga bo'linadi.
+        Prefikslar parallel ishlaydi (umumiy RPC byudjeti ichida), userlar ID
+        bo'yicha takrorlanmaydi. Tugagan prefikslar checkpoint'ga yoziladi.
+
+        Returns:
+            (yangi topilgan userlar soni, hammasi tugadimi)
+        """
+        done = progress.setdefault('search_done', [])
+        done_set = set(done)
+        seen = set()
+        failed = []
+
+        async def search(query):
+            if query in done_set:
+                return 0
+
+            added = 0
+            offset = 0
+            limit = PREFIX_PAGES * PAGE_SIZE
+            try:
+                async for page in iter_participant_pages(
+                        self.client, entity, query=query, limit=limit, budget=self.budget):
+                    users = {user.id: user_to_cache_data(user) for user in page.users
+                             if not user.bot and user.id not in seen}
+                    if users:
+                        seen.update(users)
+                        add_users_bulk(users, verbose=False)
+                        added += len(users)
+                    offset = page.next_offset
+            except Exception as e:
+                print(f"  [OGOHLANTIRISH] Prefiks '{query}' xatolik (offset={offset}): {e}")
+                failed.append(query)
+                return added
+
+            # Hamma sahifalar to'la - prefiks chegaraga yetgan
+            full = offset >= limit
+            if full and len(query) < MAX_PREFIX_DEPTH:
+                counts = await asyncio.gather(*(search(query + ch) for ch in _child_letters(query)))
+                added += sum(counts)
+                if any(child.startswith(query) for child in failed):
+                    return added
+
+            done.append(query)
+            done_set.add(query)
+            await self._save()
+            return added
+
+        counts = await asyncio.gather(*(search(ch) for ch in _child_letters('')))
+        return sum(counts), not failed
+
+    async def run(self, group_ids):
+        """
+        Guruhlarni parallel sinxronlash
+
+        Args:
+            group_ids: FAST guruhlar (ID yoki username)
+
+        Returns:
+            Cache'ga yozilgan userlar soni
+        """
+        self._start_run([str(group_id) for group_id in group_ids])
+
+        counts = await asyncio.gather(*(self._sync_group(group_id) for group_id in group_ids))
+
+        groups = self.checkpoint['groups']
+        if all(groups[str(group_id)].get('done') for group_id in group_ids):
+            self.checkpoint['finished'] = True
+        await self._save()
+
+        return sum(counts)
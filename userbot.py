@@ -1,8 +1,8 @@
-import re
 import asyncio
 from datetime import datetime
 from pyrogram import Client, filters
 from storage import save_state, load_state
+from core.keyword_matcher import evaluate_message
 
 # ⚡ TEZLIK UCHUN: uvloop event loop (agar mavjud bo'lsa)
 try:
@@ -32,49 +32,6 @@ source_groups_cache = {
 }
 
 
-def check_keyword_match(text, keywords):
-    """Kalit so'zlarni tekshirish - OPTIMIZATSIYA QILINGAN"""
-    if not text:
-        return None
-
-    text_lower = text.lower()
-
-    # 1. Ko'p so'zli kalit so'zlar (tez tekshirish)
-    for kw in keywords:
-        if ' ' in kw and kw in text_lower:
-            return kw
-
-    # 2. Bitta so'zli kalit so'zlar
-    words = set(re.findall(r'\b\w+\b', text_lower))
-    for kw in keywords:
-        if ' ' not in kw and kw in words:
-            return kw
-
-    return None
-
-
-def check_blackword(text, blackwords):
-    """Qora ro'yxat so'zlarini tekshirish"""
-    if not text or not blackwords:
-        return None
-
-    text_lower = text.lower()
-
-    # Qora ro'yxat so'zlarini tekshirish
-    for bw in blackwords:
-        if ' ' in bw:
-            # Ko'p so'zli blackword
-            if bw in text_lower:
-                return bw
-        else:
-            # Bitta so'zli blackword
-            words = set(re.findall(r'\b\w+\b', text_lower))
-            if bw in words:
-                return bw
-
-    return None
-
-
 async def get_sender_details(chat_id, user_id):
     """
     Sender ma'lumotlarini olish (async) - NORMAL guruhlar uchun
@@ -430,7 +387,9 @@ async def message_handler(client, message):
             print(f"⚠️ Keywords yo'q, skip")
             return
 
-        matched_keyword = check_keyword_match(message.text, keywords)
+        # ⚡ Kalit so'z + blackword - bitta o'qishda
+        blackwords = [bw.lower().strip() for bw in state.get("blackwords", [])]
+        matched_keyword, found_blackword = evaluate_message(message.text, keywords, blackwords)
         if not matched_keyword:
             print(f"❌ Keyword match yo'q")
             return
@@ -438,13 +397,9 @@ async def message_handler(client, message):
         print(f"🎯 Keyword match: '{matched_keyword}'")
 
         # ⚠️ BLACKWORD TEKSHIRUVI
-        blackwords = [bw.lower().strip() for bw in state.get("blackwords", [])]
-        if blackwords:
-            print(f"🚫 Blackwords tekshirilmoqda ({len(blackwords)} ta)...")
-            found_blackword = check_blackword(message.text, blackwords)
-            if found_blackword:
-                print(f"🚫 Blackword topildi: '{found_blackword}' - xabar o'tkazib yuborildi")
-                return
+        if found_blackword:
+            print(f"🚫 Blackword topildi: '{found_blackword}' - xabar o'tkazib yuborildi")
+            return
 
         print(f"✅ YUBORISH: '{matched_keyword}' [{group_type.upper()}]")
 